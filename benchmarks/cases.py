@@ -0,0 +1,160 @@
+"""
+Benchmark cases: each entry maps a name to a setup function returning the callable to time
+"""
+from io import BytesIO
+from typing import Callable, Dict
+
+from tinyblock.hd import ExtendedPrivateKey
+from tinyblock.scanner import KIND_PKH, WalletScanner
+from tinyblock.script import Script
+from tinyblock.secp256kl import G, PrivateKey, S256Point
+from tinyblock.tx import Tx
+from tinyblock.txbatch import TxBatch
+from tinyblock.utils import base58_encode, hash160, hash256
+
+from . import fixtures
+
+
+def generator_mul() -> Callable:
+    # Routed to the fixed-base table of G
+    secret = fixtures.SECRET
+    return lambda: secret * G
+
+
+def point_rmul() -> Callable:
+    # Variable-base double-and-add on a point other than G
+    point = fixtures.private_key().point
+    secret = fixtures.Z
+    return lambda: secret * point
+
+
+def private_key_new() -> Callable:
+    secret = fixtures.SECRET
+    return lambda: PrivateKey(secret)
+
+
+def private_key_sign() -> Callable:
+    key = fixtures.private_key()
+    z = fixtures.Z
+
+    def sign():
+        # Measure a fresh signature, not a signature cache hit
+        key.clear_signature_cache()
+        return key.sign(z)
+    return sign
+
+
+def private_key_sign_many() -> Callable:
+    key = fixtures.private_key()
+    zs = fixtures.digests(10)
+
+    def sign_many():
+        key.clear_signature_cache()
+        return key.sign_many(zs)
+    return sign_many
+
+
+def point_is_valid() -> Callable:
+    key = fixtures.private_key()
+    sig = fixtures.signature(key)
+    point = key.point
+    z = fixtures.Z
+    return lambda: point.is_valid(z, sig)
+
+
+def point_from_sec_compressed() -> Callable:
+    sec = fixtures.private_key().point.to_sec(compressed=True)
+    return lambda: S256Point.from_sec(sec)
+
+
+def point_from_sec_uncompressed() -> Callable:
+    sec = fixtures.private_key().point.to_sec(compressed=False)
+    return lambda: S256Point.from_sec(sec)
+
+
+def base58() -> Callable:
+    data = b'\x00' + fixtures.DATA[:24]
+    return lambda: base58_encode(data)
+
+
+def hash160_1k() -> Callable:
+    data = fixtures.DATA
+    return lambda: hash160(data)
+
+
+def hash256_1k() -> Callable:
+    data = fixtures.DATA
+    return lambda: hash256(data)
+
+
+def tx_parse(num_inputs: int) -> Callable:
+    def setup():
+        raw = fixtures.raw_tx(num_inputs)
+        return lambda: Tx.parse(BytesIO(raw))
+    return setup
+
+
+def txbatch_parse(num_inputs: int) -> Callable:
+    def setup():
+        raw = fixtures.raw_tx(num_inputs)
+        return lambda: TxBatch.from_raw([raw])
+    return setup
+
+
+def tx_serialize(num_inputs: int) -> Callable:
+    def setup():
+        tx = fixtures.make_tx(num_inputs)
+        return tx.serialize
+    return setup
+
+
+def tx_id(num_inputs: int) -> Callable:
+    def setup():
+        tx = fixtures.make_tx(num_inputs)
+        return tx.id
+    return setup
+
+
+def hd_public_children() -> Callable:
+    account = ExtendedPrivateKey.from_seed(fixtures.DATA[:32]).derive("m/44'/0'/0'").public_key()
+    return lambda: account.derive_range('m/0', range(10))
+
+
+def scanner_block() -> Callable:
+    # 100 transactions with 2 outputs each against 10000 watched keys, none of which match
+    raw = b'\x00' * 80 + bytes([100]) + b''.join(fixtures.raw_tx(2) for _ in range(100))
+    scanner = WalletScanner({KIND_PKH + d.to_bytes(32, 'big')[:20] for d in fixtures.digests(10000)})
+    return lambda: scanner.scan_block(raw)
+
+
+def script_eval() -> Callable:
+    # Only stack and hashing opcodes are implemented, so the script exercises dispatch and hashing
+    script = Script([fixtures.DATA[:33], 0x76, 0xa9, 0x76, 0xaa, 0x76, 0xa9, 0x76, 0xaa])
+    z = fixtures.Z
+    return lambda: script.eval(z)
+
+
+BENCHMARKS: Dict[str, Callable[[], Callable]] = {
+    'ecc.generator_mul': generator_mul,
+    'ecc.point_rmul': point_rmul,
+    'ecc.private_key_new': private_key_new,
+    'ecc.private_key_sign': private_key_sign,
+    'ecc.private_key_sign_many_10': private_key_sign_many,
+    'ecc.point_is_valid': point_is_valid,
+    'ecc.from_sec_compressed': point_from_sec_compressed,
+    'ecc.from_sec_uncompressed': point_from_sec_uncompressed,
+    'utils.base58_encode': base58,
+    'utils.hash160_1k': hash160_1k,
+    'utils.hash256_1k': hash256_1k,
+    'tx.parse_1_input': tx_parse(1),
+    'tx.parse_500_inputs': tx_parse(500),
+    'txbatch.parse_1_input': txbatch_parse(1),
+    'txbatch.parse_500_inputs': txbatch_parse(500),
+    'tx.serialize_1_input': tx_serialize(1),
+    'tx.serialize_500_inputs': tx_serialize(500),
+    'tx.id_1_input': tx_id(1),
+    'tx.id_500_inputs': tx_id(500),
+    'script.eval': script_eval,
+    'scanner.block_100_txs': scanner_block,
+    'hd.public_children_10': hd_public_children,
+}
@@ -0,0 +1,47 @@
+"""
+Deterministic inputs shared by the benchmark cases
+"""
+from typing import List
+
+from tinyblock.script import Script
+from tinyblock.secp256kl import PrivateKey
+from tinyblock.tx import Tx, TxIn, TxOut
+from tinyblock.utils import hash256
+
+
+SECRET = int.from_bytes(hash256(b'tinyblock benchmark secret'), 'big')
+Z = int.from_bytes(hash256(b'tinyblock benchmark message'), 'big')
+
+# 1 KiB of pseudo random data for the hashing and encoding cases
+DATA = b''.join(hash256(i.to_bytes(4, 'little')) for i in range(32))
+
+
+def private_key() -> PrivateKey:
+    return PrivateKey(SECRET)
+
+
+def digests(n: int) -> List[int]:
+    return [int.from_bytes(hash256(Z.to_bytes(32, 'big') + i.to_bytes(4, 'little')), 'big') for i in range(n)]
+
+
+def signature(key: PrivateKey):
+    return key.sign(Z)
+
+
+def p2pkh_script(h160: bytes) -> Script:
+    return Script([0x76, 0xa9, h160, 0x88, 0xac])
+
+
+def make_tx(num_inputs: int, num_outputs: int = 2) -> Tx:
+    tx_ins = []
+    for i in range(num_inputs):
+        seed = i.to_bytes(4, 'little')
+        script_sig = Script([hash256(seed) * 2 + b'\x01\x30\x44\x02\x20\x01\x02', b'\x02' + hash256(seed + b'pub')])
+        tx_ins.append(TxIn(hash256(seed), i % 4, script_sig, 0xfffffffe))
+
+    tx_outs = [TxOut(100000 * (i + 1), p2pkh_script(hash256(bytes([i]))[:20])) for i in range(num_outputs)]
+    return Tx(1, tx_ins, tx_outs, 650000)
+
+
+def raw_tx(num_inputs: int) -> bytes:
+    return make_tx(num_inputs).serialize()
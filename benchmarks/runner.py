@@ -0,0 +1,113 @@
+"""
+Times the benchmark cases, writes JSON results and compares them against a baseline
+
+    python -m benchmarks --output results.json --baseline benchmarks/baseline.json --threshold 0.1
+"""
+from typing import Dict, List, Tuple
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import sys
+import time
+import timeit
+
+from .cases import BENCHMARKS
+
+
+RESULTS_VERSION = 1
+
+
+def run_case(fn, repeat: int = 5, min_time: float = 0.2) -> Dict:
+    """
+    Returns the best seconds per call of fn over repeat rounds of at least min_time each
+    """
+    timer = timeit.Timer(fn)
+    number = 1
+    while True:
+        if timer.timeit(number) >= min_time:
+            break
+        number *= 2
+
+    times = timer.repeat(repeat=repeat, number=number)
+    return {
+        'seconds_per_op': min(times) / number,
+        'number': number,
+        'repeat': repeat,
+    }
+
+
+def run(names: List[str], repeat: int = 5, min_time: float = 0.2, out=sys.stdout) -> Dict:
+    results = {}
+    for name in names:
+        fn = BENCHMARKS[name]()
+        results[name] = run_case(fn, repeat, min_time)
+        print(f'{name:32} {results[name]["seconds_per_op"] * 1e6:14.2f} us/op', file=out)
+
+    return {
+        'version': RESULTS_VERSION,
+        'timestamp': int(time.time()),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'results': results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[Tuple[str, float, float, float]]:
+    """
+    Returns (name, baseline, current, ratio) for every case slower than baseline by more than threshold
+    """
+    regressions = []
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+
+        ratio = result['seconds_per_op'] / base['seconds_per_op']
+        if ratio > 1 + threshold:
+            regressions.append((name, base['seconds_per_op'], result['seconds_per_op'], ratio))
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-k', '--filter', default='*', help='glob selecting the cases to run')
+    parser.add_argument('-o', '--output', help='write JSON results to this file')
+    parser.add_argument('-b', '--baseline', help='JSON results to compare against')
+    parser.add_argument('-t', '--threshold', type=float, default=0.10,
+                        help='allowed slowdown relative to the baseline (default 0.10 = 10%%)')
+    parser.add_argument('-r', '--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.2, help='minimum seconds per timing round')
+    parser.add_argument('-l', '--list', action='store_true', help='list the cases and exit')
+    args = parser.parse_args(argv)
+
+    names = [n for n in BENCHMARKS if fnmatch.fnmatch(n, args.filter)]
+    if args.list:
+        print('\n'.join(names))
+        return 0
+
+    current = run(names, args.repeat, args.min_time)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+
+    if not args.baseline:
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f'no baseline at {args.baseline}, skipping comparison')
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    regressions = compare(current, baseline, args.threshold)
+    for name, base, curr, ratio in regressions:
+        print(f'REGRESSION {name}: {base * 1e6:.2f} -> {curr * 1e6:.2f} us/op ({ratio:.2f}x)')
+
+    if regressions:
+        return 1
+    print(f'no regressions above {args.threshold:.0%} against {args.baseline}')
+    return 0
@@ -0,0 +1,4 @@
+import os
+
+# Keep the suite away from the developer's ~/.cache: no generator table is loaded from or saved to disk
+os.environ['TINYBLOCK_TABLE_CACHE'] = ''
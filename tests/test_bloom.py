@@ -0,0 +1,83 @@
+from unittest import TestCase
+from io import BytesIO
+
+from tinyblock.bloom import BloomFilter, murmur3, BLOOM_UPDATE_ALL, BLOOM_UPDATE_NONE
+from tinyblock.tx import Tx, TxIn, TxOut
+from tinyblock.script import Script
+
+
+class Murmur3Test(TestCase):
+    def test_vectors(self):
+        vectors = [
+            (0x00000000, 0x00000000, ''),
+            (0x6a396f08, 0xfba4c795, ''),
+            (0x81f16f39, 0xffffffff, ''),
+            (0x514e28b7, 0x00000000, '00'),
+            (0xea3f0b17, 0xfba4c795, '00'),
+            (0xfd6cf10d, 0x00000000, 'ff'),
+            (0x16c6b7ab, 0x00000000, '0011'),
+            (0x8eb51c3d, 0x00000000, '001122'),
+            (0xb4471bf8, 0x00000000, '00112233'),
+            (0xe2301fa8, 0x00000000, '0011223344'),
+        ]
+        for expected, seed, data in vectors:
+            self.assertEqual(murmur3(bytes.fromhex(data), seed), expected)
+
+
+class BloomFilterTest(TestCase):
+    def setUp(self):
+        self.raw_tx = bytes.fromhex('0100000001813f79011acb80925dfe69b3def355fe914bd1d96a3f5f71bf8303c6a989c7d1000000006b483045022100ed81ff192e75a3fd2304004dcadb746fa5e24c5031ccfcf21320b0277457c98f02207a986d955c6e0cb35d446a89d3f56100f4d7f67801c31967743a9c8e10615bed01210349fc4e631e3624a545de3f89f5d8684c7b8138bd94bdd531d2e213bf016b278afeffffff02a135ef01000000001976a914bc3b654dca7e56b04dca18f2566cdaf02e8d9ada88ac99c39800000000001976a9141c4bc762dd5423e332166702cb75f40df79fea1288ac19430600')
+        self.tx = Tx.parse(BytesIO(self.raw_tx))
+
+    def test_bip37_serialize(self):
+        items = [
+            '99108ad8ed9bb6274d3980bab5a85c048f0950c8',
+            'b5a2c786d9ef4658287ced5914b37a1b4aa32eee',
+            'b9300670b4c5366e95b2699e8b18bc75e5f729c5',
+        ]
+        bloom = BloomFilter.from_elements(3, 0.01, 0, BLOOM_UPDATE_ALL)
+        bloom.add(bytes.fromhex(items[0]))
+        self.assertIn(bytes.fromhex(items[0]), bloom)
+        self.assertNotIn(bytes.fromhex('19108ad8ed9bb6274d3980bab5a85c048f0950c8'), bloom)
+
+        bloom.add_many(bytes.fromhex(i) for i in items[1:])
+        self.assertEqual(bloom.filterload().hex(), '03614e9b050000000000000001')
+
+        tweaked = BloomFilter.from_elements(3, 0.01, 2147483649, BLOOM_UPDATE_ALL)
+        tweaked.add_many(bytes.fromhex(i) for i in items)
+        self.assertEqual(tweaked.filterload().hex(), '03ce4299050000000100008001')
+
+    def test_parse(self):
+        bloom = BloomFilter.from_filterload(bytes.fromhex('03614e9b050000000000000001'))
+
+        self.assertEqual(bloom.function_count, 5)
+        self.assertEqual(bloom.flags, BLOOM_UPDATE_ALL)
+        self.assertIn(bytes.fromhex('b9300670b4c5366e95b2699e8b18bc75e5f729c5'), bloom)
+
+    def test_match_tx(self):
+        bloom = BloomFilter(10, 5, 99, BLOOM_UPDATE_NONE)
+        self.assertFalse(bloom.match_tx(self.tx))
+
+        by_txid = BloomFilter(10, 5, 99)
+        by_txid.add(self.tx.hash())
+        self.assertTrue(by_txid.match_tx(self.tx))
+
+        by_outpoint = BloomFilter(10, 5, 99)
+        by_outpoint.add(self.raw_tx[5:41])
+        self.assertTrue(by_outpoint.match_tx(self.tx))
+
+        by_script_sig = BloomFilter(10, 5, 99)
+        by_script_sig.add(self.tx.tx_ins[0].script_sig.cmds[1])
+        self.assertTrue(by_script_sig.match_tx(self.tx))
+
+    def test_match_updates_outpoints(self):
+        bloom = BloomFilter(10, 5, 99, BLOOM_UPDATE_ALL)
+        bloom.add(bytes.fromhex('bc3b654dca7e56b04dca18f2566cdaf02e8d9ada'))
+        self.assertTrue(bloom.match_tx(self.tx))
+
+        # A transaction spending the matched output now matches through its outpoint
+        spend = Tx(1, [TxIn(self.tx.hash()[::-1], 0)], [TxOut(1000, Script([0x6a]))])
+        self.assertTrue(bloom.match_tx(spend))
+
+        other = Tx(1, [TxIn(self.tx.hash()[::-1], 1)], [TxOut(1000, Script([0x6a]))])
+        self.assertFalse(bloom.match_tx(other))
@@ -0,0 +1,159 @@
+from unittest import TestCase
+from io import BytesIO
+import os
+import tempfile
+
+from tinyblock.block import BlockHeader, bits_to_target, target_to_bits, calculate_new_bits
+from tinyblock.chain import HeaderChain, ChainParams, MAINNET, REGTEST, check_pow_batch
+from tinyblock.utils import hash256
+
+
+def mine(prev: bytes, timestamp: int, bits: bytes, tag: int = 0) -> bytes:
+    """
+    Returns a raw header on top of the little endian hash prev that satisfies bits
+    """
+    prefix = (1).to_bytes(4, 'little') + prev + tag.to_bytes(32, 'little') + timestamp.to_bytes(4, 'little') + bits
+    target = bits_to_target(bits)
+    nonce = 0
+    while True:
+        raw = prefix + nonce.to_bytes(4, 'little')
+        if int.from_bytes(hash256(raw), 'little') <= target:
+            return raw
+        nonce += 1
+
+
+def mine_chain(prev: bytes, count: int, start: int, bits: bytes, spacing: int = 600, tag: int = 0) -> bytes:
+    headers = []
+    for i in range(count):
+        header = mine(prev, start + i * spacing, bits, tag)
+        headers.append(header)
+        prev = hash256(header)
+    return b''.join(headers)
+
+
+class BlockHeaderTest(TestCase):
+    def test_genesis(self):
+        header = BlockHeader.parse(BytesIO(MAINNET.genesis))
+
+        self.assertEqual(header.id(), '000000000019d6689c085ae165831e934ff763ae46a2a6c172b3f1b60a8ce26f')
+        self.assertEqual(header.serialize(), MAINNET.genesis)
+        self.assertTrue(header.check_pow())
+        self.assertEqual(header.difficulty(), 1)
+
+    def test_pow_boundary(self):
+        # A hash exactly equal to the target is valid, as in check_pow_batch
+        header = BlockHeader.parse(BytesIO(MAINNET.genesis))
+        proof = int.from_bytes(hash256(MAINNET.genesis), 'little')
+        header.target = lambda: proof
+        self.assertTrue(header.check_pow())
+        header.target = lambda: proof - 1
+        self.assertFalse(header.check_pow())
+
+    def test_bits_roundtrip(self):
+        for bits in ('ffff001d', 'e93c0118', 'ffff7f20'):
+            bits = bytes.fromhex(bits)
+            self.assertEqual(target_to_bits(bits_to_target(bits)), bits)
+
+    def test_calculate_new_bits(self):
+        prev_bits = bytes.fromhex('54d80118')
+        self.assertEqual(calculate_new_bits(prev_bits, 302400), bytes.fromhex('00157617'))
+
+
+class HeaderChainTest(TestCase):
+    def setUp(self):
+        self.genesis_hash = hash256(REGTEST.genesis)
+        self.bits = REGTEST.genesis[72:76]
+
+    def test_extend(self):
+        chain = HeaderChain(REGTEST)
+        raw = mine_chain(self.genesis_hash, 20, 1296688602, self.bits)
+
+        self.assertEqual(chain.add_headers(raw), 20)
+        self.assertEqual(chain.height, 20)
+        self.assertEqual(chain.raw_header(20), raw[-80:])
+        self.assertEqual(chain.tip, hash256(raw[-80:])[::-1])
+        self.assertEqual(chain.get_height(chain.tip), 20)
+        self.assertEqual(chain.offset(5), 5 * 80)
+
+        # Re-adding known headers is a no-op
+        self.assertEqual(chain.add_headers(raw), 0)
+
+    def test_rejects_bad_pow(self):
+        chain = HeaderChain(REGTEST)
+        raw = bytearray(mine_chain(self.genesis_hash, 3, 1296688602, self.bits))
+        while int.from_bytes(hash256(raw[80:160]), 'little') <= bits_to_target(self.bits):
+            raw[156] += 1
+
+        with self.assertRaises(ValueError):
+            chain.add_headers(raw)
+        self.assertEqual(chain.height, 0)
+
+        with self.assertRaises(ValueError):
+            check_pow_batch(raw)
+
+    def test_rejects_orphan(self):
+        chain = HeaderChain(REGTEST)
+        raw = mine_chain(b'\x11' * 32, 1, 1296688602, self.bits)
+
+        with self.assertRaises(ValueError):
+            chain.add_headers(raw)
+
+    def test_reorg(self):
+        chain = HeaderChain(REGTEST)
+        main = mine_chain(self.genesis_hash, 5, 1296688602, self.bits)
+        chain.add_headers(main)
+
+        fork_point = hash256(main[2 * 80:3 * 80])
+        fork = mine_chain(fork_point, 4, 1296690000, self.bits, tag=1)
+        chain.add_headers(fork[:2 * 80])
+
+        # Equal work does not replace the current tip
+        self.assertEqual(chain.tip, hash256(main[-80:])[::-1])
+        self.assertEqual(len(chain.tips()), 2)
+
+        chain.add_headers(fork[2 * 80:])
+        self.assertEqual(chain.height, 7)
+        self.assertEqual(chain.tip, hash256(fork[-80:])[::-1])
+        self.assertIsNone(chain.get_height(hash256(main[-80:])[::-1]))
+        self.assertEqual(chain.get_height(fork_point[::-1]), 3)
+        self.assertEqual(chain.tips()[0], (chain.tip, 7))
+
+    def test_retarget(self):
+        params = ChainParams(REGTEST.genesis, REGTEST.pow_limit, retarget_interval=4, target_timespan=4 * 600)
+        chain = HeaderChain(params)
+
+        # Blocks came faster than expected, the next period must be harder
+        raw = mine_chain(self.genesis_hash, 3, 1296688602, self.bits, spacing=300)
+        chain.add_headers(raw)
+
+        prev = hash256(raw[-80:])
+        expected = calculate_new_bits(self.bits, 2 * 300, 4 * 600, REGTEST.pow_limit)
+        self.assertNotEqual(expected, self.bits)
+        with self.assertRaises(ValueError):
+            chain.add_headers(mine(prev, 1296689600, self.bits))
+
+        chain.add_headers(mine(prev, 1296689600, expected))
+        self.assertEqual(chain.height, 4)
+
+    def test_file_backed(self):
+        raw = mine_chain(self.genesis_hash, 10, 1296688602, self.bits)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'headers.dat')
+            with HeaderChain(REGTEST, path) as chain:
+                chain.add_headers(raw)
+                self.assertEqual(chain.raw_header(7), raw[6 * 80:7 * 80])
+
+            self.assertEqual(os.path.getsize(path), 11 * 80)
+            with HeaderChain(REGTEST, path) as chain:
+                self.assertEqual(chain.height, 10)
+                self.assertEqual(chain.header(10).hash(), hash256(raw[-80:])[::-1])
+                self.assertEqual(chain.header(7).serialize(), raw[6 * 80:7 * 80])
+
+    def test_locator(self):
+        chain = HeaderChain(REGTEST)
+        chain.add_headers(mine_chain(self.genesis_hash, 30, 1296688602, self.bits))
+        locator = chain.locator()
+
+        self.assertEqual(locator[0], chain.tip)
+        self.assertEqual(locator[-1], chain.block_hash(0))
+        self.assertLess(len(locator), 30)
@@ -0,0 +1,70 @@
+from unittest import TestCase
+
+from tinyblock.gcs import BitReader, BitWriter, GCSFilter, siphash, build_basic_filter, match_any, filter_header
+from tinyblock.script import Script
+from tinyblock.tx import Tx, TxOut
+
+
+class SipHashTest(TestCase):
+    def test_vectors(self):
+        key = bytes(range(16))
+
+        self.assertEqual(siphash(key, b''), 0x726fdb47dd0e0e31)
+        self.assertEqual(siphash(key, bytes(range(8))), 0x93f5f5799a932462)
+        self.assertEqual(siphash(key, bytes(range(15))), 0xa129ca6149be45e5)
+
+
+class BitStreamTest(TestCase):
+    def test_roundtrip(self):
+        values = [0, 1, 7, 524287, 524288, 3 * 2**19 + 5, 12345]
+        writer = BitWriter()
+        writer.write_bits(0b101, 3)
+        for v in values:
+            writer.write_golomb_rice(v, 19)
+
+        reader = BitReader(writer.flush())
+        self.assertEqual(reader.read_bits(3), 0b101)
+        self.assertEqual([reader.read_golomb_rice(19) for _ in values], values)
+
+
+class GCSFilterTest(TestCase):
+    def setUp(self):
+        # Testnet genesis block
+        self.block_hash = bytes.fromhex('000000000933ea01ad0ee984209779baaec3ced90fa3f408719526f8d77f4943')
+        self.script_pubkey = Script([
+            bytes.fromhex('04678afdb0fe5548271967f1a67130b7105cd6a828e03909a67962e0ea1f61deb649f6bc3f4cef38c4f35504e51ec112de5c384df7ba0b8d578a4c702b6bf11d5f'),
+            0xac
+        ])
+        self.coinbase = Tx(1, [], [TxOut(5000000000, self.script_pubkey)])
+
+    def test_genesis_filter(self):
+        gcs = build_basic_filter(self.block_hash, [self.coinbase])
+
+        self.assertEqual(gcs.serialize().hex(), '019dfca8')
+        self.assertEqual(
+            filter_header(gcs, bytes(32))[::-1].hex(),
+            '21584579b7eb08997773e5aeff3a7f932700042d0ed2a6129012b7d7ae81b750'
+        )
+
+        parsed = GCSFilter.parse(self.block_hash, gcs.serialize())
+        self.assertTrue(parsed.match(self.script_pubkey.serialize()[1:]))
+        self.assertFalse(parsed.match(b'\x6a'))
+
+    def test_op_return_excluded(self):
+        tx = Tx(1, [], [TxOut(0, Script([0x6a, b'data'])), TxOut(0, Script())])
+        gcs = build_basic_filter(self.block_hash, [tx])
+
+        self.assertEqual(gcs.n, 0)
+        self.assertFalse(match_any(gcs, [b'\x6a\x04data']))
+
+    def test_match_any(self):
+        items = [i.to_bytes(4, 'big') * 5 for i in range(500)]
+        gcs = GCSFilter.build(self.block_hash[::-1][:16], items)
+        self.assertEqual(gcs.values(), sorted(gcs.values()))
+
+        misses = [b'miss' + i.to_bytes(4, 'big') for i in range(1000)]
+        expected = [m for m in misses if gcs.match(m)]
+
+        self.assertTrue(match_any(gcs, misses + [items[250]]))
+        self.assertEqual(match_any(gcs, misses), bool(expected))
+        self.assertFalse(match_any(gcs, []))
@@ -0,0 +1,90 @@
+from unittest import TestCase
+
+from tinyblock.hd import ExtendedPrivateKey, ExtendedPublicKey, parse_path, HARDENED
+from tinyblock.secp256kl import G, N, PrivateKey, S256Point, generator_multiply, generator_multiply_many
+from tinyblock.ecc import Point
+from tinyblock.utils import base58_decode, base58_encode
+
+
+class GeneratorMultiplyTest(TestCase):
+    def test_matches_double_and_add(self):
+        for k in (1, 2, 15, 16, 17, 0xdeadbeef, 2**255 + 12345):
+            self.assertEqual(generator_multiply(k), Point.__rmul__(G, k))
+
+    def test_many(self):
+        offset = Point.__rmul__(G, 7)
+        coefs = [1, 0xdeadbeef, N - 7, 2**255 + 12345]
+        expected = [Point.__rmul__(G, k) + offset for k in coefs]
+        self.assertEqual(generator_multiply_many(coefs, offset), expected)
+        self.assertEqual(expected[2], S256Point(None, None))
+        self.assertEqual(generator_multiply_many(coefs), [Point.__rmul__(G, k) for k in coefs])
+
+
+class Base58DecodeTest(TestCase):
+    def test_roundtrip(self):
+        for raw in (b'', b'\x00\x00\x01', bytes(range(1, 40))):
+            self.assertEqual(base58_decode(base58_encode(raw)), raw)
+
+        with self.assertRaises(ValueError):
+            base58_decode('0OIl')
+
+
+class HDTest(TestCase):
+    def setUp(self):
+        # BIP32 test vector 1
+        self.master = ExtendedPrivateKey.from_seed(bytes.fromhex('000102030405060708090a0b0c0d0e0f'))
+        self.vectors = {
+            'm': (
+                'xprv9s21ZrQH143K3QTDL4LXw2F7HEK3wJUD2nW2nRk4stbPy6cq3jPPqjiChkVvvNKmPGJxWUtg6LnF5kejMRNNU3TGtRBeJgk33yuGBxrMPHi',
+                'xpub661MyMwAqRbcFtXgS5sYJABqqG9YLmC4Q1Rdap9gSE8NqtwybGhePY2gZ29ESFjqJoCu1Rupje8YtGqsefD265TMg7usUDFdp6W1EGMcet8',
+            ),
+            "m/0'": (
+                'xprv9uHRZZhk6KAJC1avXpDAp4MDc3sQKNxDiPvvkX8Br5ngLNv1TxvUxt4cV1rGL5hj6KCesnDYUhd7oWgT11eZG7XnxHrnYeSvkzY7d2bhkJ7',
+                'xpub68Gmy5EdvgibQVfPdqkBBCHxA5htiqg55crXYuXoQRKfDBFA1WEjWgP6LHhwBZeNK1VTsfTFUHCdrfp1bgwQ9xv5ski8PX9rL2dZXvgGDnw',
+            ),
+            "m/0'/1": (
+                'xprv9wTYmMFdV23N2TdNG573QoEsfRrWKQgWeibmLntzniatZvR9BmLnvSxqu53Kw1UmYPxLgboyZQaXwTCg8MSY3H2EU4pWcQDnRnrVA1xe8fs',
+                'xpub6ASuArnXKPbfEwhqN6e3mwBcDTgzisQN1wXN9BJcM47sSikHjJf3UFHKkNAWbWMiGj7Wf5uMash7SyYq527Hqck2AxYysAA7xmALppuCkwQ',
+            ),
+            "m/0'/1/2'": (
+                'xprv9z4pot5VBttmtdRTWfWQmoH1taj2axGVzFqSb8C9xaxKymcFzXBDptWmT7FwuEzG3ryjH4ktypQSAewRiNMjANTtpgP4mLTj34bhnZX7UiM',
+                'xpub6D4BDPcP2GT577Vvch3R8wDkScZWzQzMMUm3PWbmWvVJrZwQY4VUNgqFJPMM3No2dFDFGTsxxpG5uJh7n7epu4trkrX7x7DogT5Uv6fcLW5',
+            ),
+        }
+
+    def test_parse_path(self):
+        self.assertEqual(parse_path("m/44'/0h/0H/1/2"), (44 + HARDENED, HARDENED, HARDENED, 1, 2))
+        self.assertEqual(parse_path('m'), ())
+
+    def test_vectors(self):
+        for path, (xprv, xpub) in self.vectors.items():
+            node = self.master.derive(path)
+            self.assertEqual(node.serialize(), xprv)
+            self.assertEqual(node.public_key().serialize(), xpub)
+
+    def test_parse(self):
+        xprv, xpub = self.vectors["m/0'/1"]
+        self.assertEqual(ExtendedPrivateKey.parse(xprv).serialize(), xprv)
+        self.assertEqual(ExtendedPublicKey.parse(xpub).serialize(), xpub)
+
+    def test_public_derivation(self):
+        account = self.master.derive("m/0'").public_key()
+        self.assertEqual(account.child(1).serialize(), self.vectors["m/0'/1"][1])
+
+        with self.assertRaises(ValueError):
+            account.child(HARDENED)
+
+    def test_cached_batch(self):
+        account = self.master.derive("m/0'/1")
+        self.assertIs(self.master.derive("m/0'/1"), account)
+
+        batch = self.master.derive_range("m/0'/1", range(5))
+        public_batch = account.public_key().derive_range('m', range(5))
+        for i in range(5):
+            self.assertEqual(batch[i].serialize(), account.child(i).serialize())
+            self.assertEqual(public_batch[i].serialize(), batch[i].public_key().serialize())
+            self.assertEqual(batch[i].private_key, PrivateKey(batch[i].private_key.secret))
+
+        # The point always comes from the secret, it cannot be passed in
+        with self.assertRaises(TypeError):
+            PrivateKey(1, G)
@@ -0,0 +1,129 @@
+from unittest import TestCase
+import importlib
+import sys
+import tempfile
+
+from tinyblock import instrument, utils
+from tinyblock.ecc import FieldElement
+from tinyblock.opcodes import OP_CODE_FUNCTIONS, op_dup
+from tinyblock.script import Script
+from tinyblock.secp256kl import PrivateKey, generator_table_ints
+from tinyblock.tx import TxFetcher
+from tinyblock.utils import hash256, checksum_base58
+
+
+class InstrumentTest(TestCase):
+    def setUp(self):
+        # Build the fixed-base table outside the profiled blocks, its one-time cost is not counted here
+        generator_table_ints()
+
+    def tearDown(self):
+        instrument.disable()
+        instrument.reset()
+
+    def test_disabled_is_untouched(self):
+        original = FieldElement.__mul__
+        instrument.enable()
+        self.assertIsNot(FieldElement.__mul__, original)
+
+        instrument.disable()
+        self.assertIs(FieldElement.__mul__, original)
+        self.assertIs(OP_CODE_FUNCTIONS[118], op_dup)
+
+        hash256(b'abc')
+        self.assertEqual(instrument.snapshot(), {})
+
+    def test_import_while_enabled(self):
+        # A module imported inside profile() binds the counting wrapper at import time
+        hash160, hash256 = utils.hash160, utils.hash256
+        original = sys.modules.pop('tinyblock.scanner', None)
+        try:
+            with instrument.profile():
+                scanner = importlib.import_module('tinyblock.scanner')
+                self.assertIsNot(scanner.hash160, hash160)
+
+            self.assertIs(scanner.hash160, hash160)
+            self.assertIs(scanner.hash256, hash256)
+            scanner.hash160(b'x')
+            self.assertEqual(instrument.snapshot().get('hash.hash160.calls', 0), 0)
+        finally:
+            if original is not None:
+                sys.modules['tinyblock.scanner'] = original
+
+    def test_ecc_counts(self):
+        key = PrivateKey(12345)
+        sig = key.sign(67890)
+
+        with instrument.profile() as prof:
+            self.assertTrue(key.point.is_valid(67890, sig))
+
+        self.assertGreater(prof['point.double'], 200)
+        self.assertGreater(prof['point.add'], 0)
+        self.assertGreaterEqual(prof['field.inv'], prof['point.add'] + prof['point.double'] - 10)
+        self.assertEqual(prof['point.scalar_mul'], 1)
+        self.assertEqual(prof['point.generator_mul'], 1)
+        # u*G runs on the integer Jacobian path: table additions and one inversion
+        self.assertGreater(prof['point.jacobian_add'], 30)
+        self.assertEqual(prof['field.batch_inv_values'], 1)
+
+    def test_fixed_base_counts(self):
+        with instrument.profile() as prof:
+            PrivateKey(int.from_bytes(hash256(b'fixed base'), 'big'))
+        self.assertEqual(prof['point.generator_mul'], 1)
+        self.assertGreater(prof['point.jacobian_add'], 30)
+        self.assertLessEqual(prof['point.jacobian_add'], 64)
+        self.assertEqual(prof['field.inv'], 1)
+        self.assertEqual(prof['point.scalar_mul'], 0)  # Only variable-base multiplications
+        self.assertEqual(prof['point.double'], 0)
+
+    def test_signing_counts(self):
+        key = PrivateKey(12345)
+
+        with instrument.profile() as prof:
+            key.sign(67890)
+        self.assertEqual(prof['point.generator_mul'], 1)
+        self.assertEqual(prof['field.inv'], 2)  # Z**-1 mod P and k**-1 mod N
+        self.assertGreater(prof['field.mul'], 0)
+
+        with instrument.profile() as prof:
+            key.sign_many([1, 2, 3])
+        self.assertEqual(prof['point.generator_mul'], 3)
+        self.assertEqual(prof['field.inv'], 2)
+        self.assertEqual(prof['field.batch_inv_values'], 6)
+
+        # Cached signatures do no curve work at all
+        with instrument.profile() as prof:
+            key.sign(67890)
+        self.assertEqual(prof['point.generator_mul'], 0)
+        self.assertFalse(instrument.is_enabled())
+
+    def test_hash_and_opcode_counts(self):
+        with instrument.profile() as prof:
+            Script([b'abc', 0x76, 0xa9, 0xaa]).eval(0)
+            checksum_base58(b'\x00' * 21)
+
+        self.assertEqual(prof['opcode.op_dup'], 1)
+        self.assertEqual(prof['opcode.op_hash160'], 1)
+        self.assertEqual(prof['hash.hash160.calls'], 1)
+        self.assertEqual(prof['hash.hash256.calls'], 2)
+        self.assertEqual(prof['hash.hash256.bytes'], 20 + 21)
+
+    def test_fetcher_counts(self):
+        raw = bytes.fromhex('0100000001813f79011acb80925dfe69b3def355fe914bd1d96a3f5f71bf8303c6a989c7d1000000006b483045022100ed81ff192e75a3fd2304004dcadb746fa5e24c5031ccfcf21320b0277457c98f02207a986d955c6e0cb35d446a89d3f56100f4d7f67801c31967743a9c8e10615bed01210349fc4e631e3624a545de3f89f5d8684c7b8138bd94bdd531d2e213bf016b278afeffffff02a135ef01000000001976a914bc3b654dca7e56b04dca18f2566cdaf02e8d9ada88ac99c39800000000001976a9141c4bc762dd5423e332166702cb75f40df79fea1288ac19430600')
+        cache_dir = TxFetcher.CACHE_DIR
+        download = TxFetcher.__dict__['download']
+        with tempfile.TemporaryDirectory() as tmp:
+            TxFetcher.CACHE_DIR = tmp
+            TxFetcher.download = staticmethod(lambda tx_id, testnet=False: raw)
+            try:
+                with instrument.profile() as prof:
+                    TxFetcher.fetch('aa' * 32)
+                    TxFetcher.fetch('aa' * 32)
+            finally:
+                TxFetcher.CACHE_DIR = cache_dir
+                TxFetcher.download = download
+
+        self.assertEqual(prof['fetcher.calls'], 2)
+        self.assertEqual(prof['fetcher.misses'], 1)
+        self.assertEqual(prof['fetcher.hits'], 1)
+        self.assertGreater(prof['fetcher.seconds'], 0)
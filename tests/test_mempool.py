@@ -0,0 +1,116 @@
+from unittest import TestCase
+
+from tinyblock.mempool import Mempool
+from tinyblock.script import Script
+from tinyblock.tx import Tx, TxIn, TxOut
+
+
+def make_tx(inputs, amounts) -> Tx:
+    tx_ins = [TxIn(prev_tx, ix) for prev_tx, ix in inputs]
+    tx_outs = [TxOut(amount, Script([0x76, 0xa9, b'\x00' * 20, 0x88, 0xac])) for amount in amounts]
+    return Tx(1, tx_ins, tx_outs)
+
+
+def txid(tx: Tx) -> bytes:
+    return tx.hash()[::-1]
+
+
+class MempoolTest(TestCase):
+    def setUp(self):
+        # Every confirmed outpoint is worth 100000 sats
+        self.pool = Mempool(prevout_value=lambda tx_in: 100000)
+
+    def confirmed(self, n: int):
+        return (bytes([n]) * 32, 0)
+
+    def test_fee_cached(self):
+        lookups = []
+        pool = Mempool(prevout_value=lambda tx_in: lookups.append(tx_in) or 100000)
+        tx = make_tx([self.confirmed(1)], [90000])
+        pool.add(tx)
+
+        entry = pool.get(txid(tx))
+        self.assertEqual(entry.fee, 10000)
+        self.assertEqual(entry.size, len(tx.serialize()))
+        self.assertEqual(len(lookups), 1)
+
+        pool.add(tx)
+        self.assertEqual(len(lookups), 1)
+
+    def test_conflict(self):
+        self.pool.add(make_tx([self.confirmed(1)], [90000]))
+        with self.assertRaises(ValueError):
+            self.pool.add(make_tx([self.confirmed(1)], [80000]))
+
+    def test_package_totals(self):
+        parent = make_tx([self.confirmed(1)], [99000, 500])
+        child = make_tx([(txid(parent), 0)], [59000])
+        self.pool.add(parent)
+        self.pool.add(child)
+
+        parent_entry = self.pool.get(txid(parent))
+        child_entry = self.pool.get(txid(child))
+        self.assertEqual(child_entry.fee, 40000)
+        self.assertEqual(child_entry.ancestor_fee, 40500)
+        self.assertEqual(child_entry.ancestor_count, 2)
+        self.assertEqual(parent_entry.descendant_fee, 40500)
+        self.assertEqual(parent_entry.descendant_size, parent_entry.size + child_entry.size)
+
+        removed = self.pool.remove(txid(parent))
+        self.assertEqual(len(removed), 2)
+        self.assertEqual(len(self.pool), 0)
+        self.assertEqual(self.pool.total_size, 0)
+
+    def test_remove_confirmed(self):
+        parent = make_tx([self.confirmed(1)], [99000])
+        child = make_tx([(txid(parent), 0)], [98000])
+        self.pool.add(parent)
+        self.pool.add(child)
+
+        self.pool.remove_confirmed([parent])
+        entry = self.pool.get(txid(child))
+        self.assertEqual(entry.ancestor_count, 1)
+        self.assertEqual(entry.ancestor_fee, entry.fee)
+        self.assertEqual(entry.parents, set())
+
+    def test_evict_lowest(self):
+        low = make_tx([self.confirmed(1)], [99900])
+        high = make_tx([self.confirmed(2)], [50000])
+        self.pool.add(low)
+        self.pool.add(high)
+
+        # A high fee child rescues its low fee parent (descendant score)
+        parent = make_tx([self.confirmed(3)], [99950])
+        child = make_tx([(txid(parent), 0)], [10000])
+        self.pool.add(parent)
+        self.pool.add(child)
+
+        removed = self.pool.evict_lowest()
+        self.assertEqual([e.txid for e in removed], [txid(low)])
+
+    def test_memory_cap(self):
+        txs = [make_tx([self.confirmed(i)], [100000 - 1000 * i]) for i in range(1, 11)]
+        size = len(txs[0].serialize())
+        pool = Mempool(max_size=5 * size, prevout_value=lambda tx_in: 100000)
+
+        for tx in txs:
+            pool.add(tx)
+        self.assertEqual(len(pool), 5)
+        self.assertTrue(all(txid(tx) in pool for tx in txs[5:]))
+
+        self.assertFalse(pool.add(make_tx([self.confirmed(20)], [99999])))
+
+    def test_build_template(self):
+        a = make_tx([self.confirmed(1)], [90000])
+        parent = make_tx([self.confirmed(2)], [99990])
+        child = make_tx([(txid(parent), 0)], [70000])
+        b = make_tx([self.confirmed(3)], [99000])
+        for tx in (a, parent, child, b):
+            self.pool.add(tx)
+
+        block = self.pool.build_template()
+        self.assertEqual([txid(tx) for tx in block], [txid(parent), txid(child), txid(a), txid(b)])
+
+        size = len(a.serialize())
+        block = self.pool.build_template(max_weight=size * 4)
+        self.assertEqual([txid(tx) for tx in block], [txid(a)])
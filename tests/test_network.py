@@ -0,0 +1,182 @@
+from unittest import IsolatedAsyncioTestCase, TestCase
+from io import BytesIO
+import asyncio
+
+from tinyblock.chain import HeaderChain, REGTEST
+from tinyblock.network import (
+    NetworkEnvelope, Peer, VersionMessage, VerAckMessage, PongMessage, GetHeadersMessage, HeadersMessage,
+    GetDataMessage, NotFoundMessage, REGTEST_MAGIC,
+)
+from tinyblock.script import Script
+from tinyblock.tx import Tx, TxIn, TxOut
+from tinyblock.utils import hash256
+
+from tests.test_chain import mine_chain
+
+
+class FakeNode:
+    """
+    In-process peer serving a fixed header chain and set of transactions
+    """
+
+    def __init__(self, headers: bytes, txs, batch: int = 1):
+        self.headers = [headers[i:i + 80] for i in range(0, len(headers), 80)]
+        self.heights = {hash256(h)[::-1]: i for i, h in enumerate(self.headers)}
+        self.heights[hash256(REGTEST.genesis)[::-1]] = -1
+        self.txs = {tx.hash()[::-1]: tx for tx in txs}
+        self.batch = batch
+        self.getdata_seen = 0
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, '127.0.0.1', 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader, writer):
+        def send(message):
+            writer.write(NetworkEnvelope(message.command, message.serialize(), REGTEST_MAGIC).serialize())
+
+        pending = []
+        try:
+            while True:
+                envelope = await NetworkEnvelope.read(reader, REGTEST_MAGIC)
+                if envelope.command == b'version':
+                    send(VersionMessage(user_agent=b'/fake/'))
+                    send(VerAckMessage())
+                elif envelope.command == b'ping':
+                    send(PongMessage(envelope.payload))
+                elif envelope.command == b'getheaders':
+                    request = GetHeadersMessage.parse(envelope.stream())
+                    start = next(self.heights[h] for h in request.locator if h in self.heights) + 1
+                    send(HeadersMessage(b''.join(self.headers[start:start + 2000])))
+                elif envelope.command == b'getdata':
+                    self.getdata_seen += 1
+                    pending.extend(GetDataMessage.parse(envelope.stream()).items)
+                    if len(pending) < self.batch:
+                        continue
+                    for data_type, tx_id in pending:
+                        if tx_id in self.txs:
+                            writer.write(NetworkEnvelope(b'tx', self.txs[tx_id].serialize(), REGTEST_MAGIC).serialize())
+                        else:
+                            send(NotFoundMessage([(data_type, tx_id)]))
+                    pending = []
+                await writer.drain()
+        except asyncio.IncompleteReadError:
+            writer.close()
+
+
+class EnvelopeTest(TestCase):
+    def test_parse(self):
+        msg = bytes.fromhex('f9beb4d976657261636b000000000000000000005df6e0e2')
+        envelope = NetworkEnvelope.parse(BytesIO(msg))
+
+        self.assertEqual(envelope.command, b'verack')
+        self.assertEqual(envelope.payload, b'')
+        self.assertEqual(envelope.serialize(), msg)
+
+    def test_bad_checksum(self):
+        msg = bytes.fromhex('f9beb4d976657261636b000000000000000000005df6e0e3')
+        with self.assertRaises(SyntaxError):
+            NetworkEnvelope.parse(BytesIO(msg))
+
+    def test_version_roundtrip(self):
+        version = VersionMessage(timestamp=0, nonce=b'\x01' * 8, latest_block=123, relay=True)
+        self.assertEqual(VersionMessage.parse(BytesIO(version.serialize())), version)
+
+    def test_getheaders(self):
+        block_hash = bytes.fromhex('0000000000000000001237f46acddf58578a37e213d2a6edc4884a2fcad05ba3')
+        ser = GetHeadersMessage([block_hash]).serialize()
+
+        self.assertEqual(ser.hex(), '7f11010001a35bd0ca2f4a88c4eda6d213e2378a5758dfcd6af437120000000000000000000000000000000000000000000000000000000000000000000000000000000000')
+
+
+class PeerTest(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.headers = mine_chain(hash256(REGTEST.genesis), 2500, 1296688602, REGTEST.genesis[72:76])
+        self.txs = [
+            Tx(1, [TxIn(bytes([i]) * 32, i)], [TxOut(1000 * i, Script([0x76, 0xa9, bytes([i]) * 20, 0x88, 0xac]))])
+            for i in range(10)
+        ]
+        self.node = FakeNode(self.headers, self.txs, batch=4)
+        port = await self.node.start()
+        self.peer = await Peer.connect('127.0.0.1', port, REGTEST_MAGIC, window=4)
+
+    async def asyncTearDown(self):
+        await self.peer.close()
+        await self.node.stop()
+
+    async def test_handshake_and_ping(self):
+        self.assertEqual(self.peer.version.user_agent, b'/fake/')
+        self.assertGreaterEqual(await asyncio.wait_for(self.peer.ping(), 5), 0)
+
+    async def test_sync_headers(self):
+        chain = HeaderChain(REGTEST)
+        added = await asyncio.wait_for(self.peer.sync_headers(chain), 10)
+
+        self.assertEqual(added, 2500)
+        self.assertEqual(chain.tip, hash256(self.headers[-80:])[::-1])
+
+    async def test_pipelined_getdata(self):
+        # The node only answers once 4 requests are queued, so this completes only with a full window
+        tx_ids = [tx.hash()[::-1] for tx in self.txs[:8]]
+        got = [tx async for tx in self.peer.get_transactions(tx_ids)]
+
+        self.assertEqual([tx.hash() for tx in got], [tx.hash() for tx in self.txs[:8]])
+        self.assertEqual(self.node.getdata_seen, 8)
+
+    async def test_notfound(self):
+        tx_ids = [self.txs[0].hash()[::-1], b'\x42' * 32, self.txs[1].hash()[::-1], b'\x43' * 32]
+        got = [tx async for tx in self.peer.get_transactions(tx_ids)]
+
+        self.assertEqual(got[0].hash(), self.txs[0].hash())
+        self.assertIsNone(got[1])
+        self.assertEqual(got[2].hash(), self.txs[1].hash())
+        self.assertIsNone(got[3])
+
+    async def test_abandoned_getdata(self):
+        tx_ids = [tx.hash()[::-1] for tx in self.txs]
+        async for tx in self.peer.get_transactions(tx_ids[:8]):
+            break
+
+        # Replies still in flight for the abandoned call must not be returned here
+        got = [tx async for tx in self.peer.get_transactions(tx_ids[8:] + tx_ids[:2])]
+        self.assertEqual([tx.hash() for tx in got], [tx.hash() for tx in self.txs[8:] + self.txs[:2]])
+
+    async def test_failed_sync_discards_pipelined_reply(self):
+        class FailingChain(HeaderChain):
+            def add_headers(self, raw):
+                raise ValueError('rejected')
+
+        with self.assertRaises(ValueError):
+            await asyncio.wait_for(self.peer.sync_headers(FailingChain(REGTEST)), 10)
+
+        raw = await asyncio.wait_for(self.peer.get_headers([hash256(REGTEST.genesis)[::-1]]), 10)
+        self.assertEqual(raw, self.headers[:2000 * 80])
+
+    async def test_concurrent_requests(self):
+        # Neither request may consume the other's replies
+        chain = HeaderChain(REGTEST)
+        tx_ids = [tx.hash()[::-1] for tx in self.txs[:8]]
+
+        async def transactions():
+            return [tx async for tx in self.peer.get_transactions(tx_ids, timeout=5)]
+
+        added, got = await asyncio.wait_for(
+            asyncio.gather(self.peer.sync_headers(chain, timeout=5), transactions()), 10
+        )
+        self.assertEqual(added, 2500)
+        self.assertEqual([tx.hash() for tx in got], [tx.hash() for tx in self.txs[:8]])
+
+    async def test_timeout(self):
+        # The node holds getdata replies until 4 requests are queued
+        with self.assertRaises(asyncio.TimeoutError):
+            async for tx in self.peer.get_transactions([self.txs[0].hash()[::-1]], timeout=0.1):
+                pass
+        self.assertEqual(dict(self.peer._data_waiters), {})
+
+        with self.assertRaises(asyncio.TimeoutError):
+            await self.peer.receive(b'inv', timeout=0.01)
+        self.assertGreaterEqual(await asyncio.wait_for(self.peer.ping(), 5), 0)
@@ -0,0 +1,101 @@
+from unittest import TestCase
+import os
+import subprocess
+import sys
+import tempfile
+
+from tinyblock.network import MAINNET_MAGIC
+from tinyblock.scanner import KIND_PKH, KIND_SH, Received, Spent, WalletScanner, scan_files, script_key, watch_keys
+from tinyblock.script import Script
+from tinyblock.secp256kl import PrivateKey
+from tinyblock.tx import Tx, TxIn, TxOut
+from tinyblock.utils import checksum_base58, encode_varint, hash160
+
+
+def block(*txs: Tx) -> bytes:
+    return b'\x00' * 80 + encode_varint(len(txs)) + b''.join(tx.serialize() for tx in txs)
+
+
+def txid(tx: Tx) -> bytes:
+    return tx.hash()[::-1]
+
+
+class ScannerTest(TestCase):
+    def setUp(self):
+        self.point = PrivateKey(12345).point
+        self.h160 = self.point.hash160()
+        self.redeem = b'\x51\x21' + self.point.to_sec() + b'\x51\xae'
+        self.addresses = [self.point.address(testnet=False), checksum_base58(b'\x05' + hash160(self.redeem))]
+        self.keys = watch_keys(self.addresses)
+
+        p2pkh = Script([0x76, 0xa9, self.h160, 0x88, 0xac])
+        p2sh = Script([0xa9, hash160(self.redeem), 0x87])
+        other = Script([0x76, 0xa9, b'\x01' * 20, 0x88, 0xac])
+
+        self.funding = Tx(1, [TxIn(b'\x11' * 32, 0)], [TxOut(1000, other), TxOut(2000, p2pkh), TxOut(3000, p2sh)])
+        self.spending = Tx(1, [TxIn(b'\x22' * 32, 1), TxIn(txid(self.funding), 2)], [TxOut(4000, other)])
+
+    def test_watch_keys(self):
+        self.assertEqual(self.keys, {KIND_PKH + self.h160, KIND_SH + hash160(self.redeem)})
+        with self.assertRaises(ValueError):
+            watch_keys([checksum_base58(b'\x30' + self.h160)])
+
+    def test_no_network_import(self):
+        # scan_files workers import the scanner, keep asyncio and the p2p layer out of it
+        code = 'import sys, tinyblock.scanner; print("tinyblock.network" in sys.modules)'
+        out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+        self.assertEqual(out.split(), ['False'])
+
+    def test_script_key(self):
+        self.assertEqual(script_key(b'\x21' + self.point.to_sec() + b'\xac'), KIND_PKH + self.h160)
+        self.assertIsNone(script_key(b'\x6a\x04abcd'))
+
+    def test_scan_block(self):
+        scanner = WalletScanner(self.keys)
+        events = scanner.scan_block(block(self.funding, self.spending))
+        self.assertEqual(events, [
+            Received(txid(self.funding), 1, 2000, KIND_PKH + self.h160),
+            Received(txid(self.funding), 2, 3000, KIND_SH + hash160(self.redeem)),
+            Spent(txid(self.spending), 1, txid(self.funding), 2),
+        ])
+        self.assertEqual(list(scanner.unspent.values()), [events[0]])
+
+    def test_malformed_keeps_state(self):
+        scanner = WalletScanner(self.keys)
+        received = scanner.scan_block(block(self.funding))
+        unspent = dict(scanner.unspent)
+        self.assertEqual(len(unspent), 2)
+
+        raw = self.spending.serialize()
+        for bad in (raw[:-2], raw[:3], raw + b'\x00'):
+            with self.assertRaises(ValueError):
+                scanner.scan_tx(bad)
+            self.assertEqual(scanner.unspent, unspent)
+
+        # A block with trailing bytes is rejected like a tx with trailing bytes, and fully undone
+        with self.assertRaises(ValueError):
+            scanner.scan_block(block(self.spending, self.funding) + b'\x00')
+        self.assertEqual(scanner.unspent, unspent)
+
+        self.assertEqual(scanner.scan_tx(raw), [Spent(txid(self.spending), 1, txid(self.funding), 2)])
+        self.assertEqual(list(scanner.unspent.values()), [received[0]])
+
+    def test_segwit(self):
+        raw = self.funding.serialize()
+        witness = b'\x01\x02\xab\xcd'
+        segwit = raw[:4] + b'\x00\x01' + raw[4:-4] + witness + raw[-4:]
+        events = WalletScanner(self.keys).scan_tx(segwit)
+        self.assertEqual(events[0].tx_hash, txid(self.funding))
+
+    def test_scan_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = []
+            for name, raw in (('blk00000.dat', block(self.funding)), ('blk00001.dat', block(self.spending))):
+                paths.append(os.path.join(tmp, name))
+                with open(paths[-1], 'wb') as f:
+                    f.write(MAINNET_MAGIC + len(raw).to_bytes(4, 'little') + raw + b'\x00' * 64)
+
+            sequential = scan_files(paths, self.keys, processes=1)
+            sharded = scan_files(paths, self.keys, processes=2)
+            self.assertEqual(len(sequential), 3)
+            self.assertEqual(set(sequential), set(sharded))
@@ -0,0 +1,129 @@
+from unittest import TestCase
+import hashlib
+import os
+import subprocess
+import sys
+import tempfile
+
+from tinyblock import secp256kl
+from tinyblock.ecc import Point
+from tinyblock.secp256kl import (
+    G, N, P, PrivateKey, Signature, batch_inverse, generator_multiply, generator_table_ints, load_generator_table,
+    save_generator_table, verify_generator_table,
+)
+
+
+class BatchInverseTest(TestCase):
+    def test_batch_inverse(self):
+        values = [1, 2, 3, 0xdeadbeef, N - 1]
+        for modulus in (N, P):
+            self.assertEqual(batch_inverse(values, modulus), [pow(v, modulus - 2, modulus) for v in values])
+        self.assertEqual(batch_inverse([], N), [])
+
+
+class SignTest(TestCase):
+    def setUp(self):
+        self.z = int.from_bytes(hashlib.sha256(b'Satoshi Nakamoto').digest(), 'big')
+
+    def test_rfc6979(self):
+        key = PrivateKey(1)
+        self.assertEqual(key.deterministic_k(self.z), 0x8F8A276C19F4149656B280621E358CCE24F5F52542772691EE69063B74F15D15)
+
+        sig = key.sign(self.z)
+        self.assertEqual(sig.r, 0x934b1ea10a4b3c1757e2b0c017d0b6143ce3c9a7e6a4a49860d7a6ab210ee3d8)
+        self.assertEqual(sig.s, 0x2442ce9d2b916064108014783e923ec36b49743e2ffa1c4496f01a512aafd9e5)
+        self.assertTrue(key.point.is_valid(self.z, sig))
+
+    def test_der(self):
+        sig = PrivateKey(1).sign(self.z)
+        der = sig.to_der()
+        self.assertEqual(der[0], 0x30)
+        self.assertEqual(Signature.parse(der), sig)
+
+    def test_sign_many(self):
+        key = PrivateKey(0xdeadbeef12345)
+        zs = [self.z, 1, 2**255 + 7, self.z]
+        sigs = key.sign_many(zs)
+
+        fresh = PrivateKey(key.secret)
+        self.assertEqual(sigs, [fresh.sign(z) for z in zs])
+        for z, sig in zip(zs, sigs):
+            self.assertLessEqual(sig.s, N // 2)
+            self.assertTrue(key.point.is_valid(z, sig))
+
+    def test_cache(self):
+        key = PrivateKey(12345)
+        sig = key.sign(self.z)
+        self.assertIs(key.sign(self.z), sig)
+        self.assertIs(key.sign_many([self.z])[0], sig)
+
+        key.clear_signature_cache()
+        again = key.sign(self.z)
+        self.assertIsNot(again, sig)
+        self.assertEqual(again, sig)
+
+
+class GeneratorTableTest(TestCase):
+    def test_computed_table(self):
+        # Entries built in Jacobian coordinates match plain affine double-and-add
+        table = secp256kl._compute_generator_table()
+        for i, d in ((0, 1), (0, 15), (17, 6), (63, 15)):
+            point = Point.__rmul__(G, d * 16**i)
+            self.assertEqual(table[i][d - 1], (point.x.num, point.y.num))
+
+    def test_persisted_table(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'cache', 'table.bin')
+            self.assertIsNone(load_generator_table(path))
+
+            save_generator_table(path)
+            self.assertEqual(load_generator_table(path), generator_table_ints())
+
+            with open(path, 'r+b') as f:
+                f.seek(-1, 2)
+                f.write(b'\xff')
+            self.assertIsNone(load_generator_table(path))
+
+    def test_rejects_tampered_table(self):
+        # A wrong entry that is on the curve, with a recomputed checksum, must still be rejected
+        table = [list(row) for row in generator_table_ints()]
+        table[10][3] = (generator_multiply(2).x.num, generator_multiply(2).y.num)
+        self.assertFalse(verify_generator_table(table))
+        self.assertTrue(verify_generator_table(generator_table_ints()))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'table.bin')
+            save_generator_table(path, table)
+            self.assertIsNone(load_generator_table(path))
+
+            table = [list(row) for row in generator_table_ints()]
+            table[-1][-1] = (table[-1][-1][0], P - table[-1][-1][1])
+            save_generator_table(path, table)
+            self.assertIsNone(load_generator_table(path))
+
+    def test_cache_path(self):
+        self.assertEqual(secp256kl.TABLE_CACHE_PATH, '')
+
+        table = list(generator_table_ints())
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'table.bin')
+            secp256kl.TABLE_CACHE_PATH = path
+            del secp256kl._generator_table_ints[:]
+            try:
+                self.assertEqual(generator_table_ints(), table)
+                self.assertTrue(os.path.exists(path))
+
+                del secp256kl._generator_table_ints[:]
+                self.assertEqual(generator_table_ints(), table)
+            finally:
+                secp256kl.TABLE_CACHE_PATH = ''
+                secp256kl._generator_table_ints[:] = table
+
+    def test_generator_multiply(self):
+        self.assertEqual(generator_multiply(1), G)
+        self.assertEqual(generator_multiply(N), G.__class__(None, None))
+
+    def test_lazy_imports(self):
+        code = 'import sys, tinyblock.tx, tinyblock.secp256kl as s; print("requests" in sys.modules, bool(s._generator_table_ints))'
+        out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+        self.assertEqual(out.split(), ['False', 'False'])
@@ -0,0 +1,91 @@
+from unittest import TestCase
+
+from tinyblock.script import Script
+from tinyblock.tx import Tx, TxIn, TxOut
+from tinyblock.txbatch import TxBatch
+from tinyblock.utils import encode_varint
+
+
+RAW_TX = bytes.fromhex('0100000001813f79011acb80925dfe69b3def355fe914bd1d96a3f5f71bf8303c6a989c7d1000000006b483045022100ed81ff192e75a3fd2304004dcadb746fa5e24c5031ccfcf21320b0277457c98f02207a986d955c6e0cb35d446a89d3f56100f4d7f67801c31967743a9c8e10615bed01210349fc4e631e3624a545de3f89f5d8684c7b8138bd94bdd531d2e213bf016b278afeffffff02a135ef01000000001976a914bc3b654dca7e56b04dca18f2566cdaf02e8d9ada88ac99c39800000000001976a9141c4bc762dd5423e332166702cb75f40df79fea1288ac19430600')
+
+
+def p2pkh(n: int) -> Script:
+    return Script([0x76, 0xa9, bytes([n]) * 20, 0x88, 0xac])
+
+
+class TxBatchTest(TestCase):
+    def setUp(self):
+        self.coinbase = Tx(1, [TxIn(b'\x00' * 32, 0xffffffff, Script([b'\x03\x01\x02\x03']))], [TxOut(5000000000, p2pkh(1))])
+        self.spend = Tx(2, [TxIn(self.coinbase.hash()[::-1], 0)], [TxOut(3000000000, p2pkh(2)), TxOut(1999990000, p2pkh(3))], 100)
+        self.block = b'\x00' * 80 + encode_varint(2) + self.coinbase.serialize() + self.spend.serialize()
+
+    def test_roundtrip(self):
+        batch = TxBatch.from_raw([RAW_TX, RAW_TX])
+        self.assertEqual(len(batch), 2)
+        self.assertEqual(batch[1].serialize(), RAW_TX)
+        self.assertEqual(batch.tx_hash(0), batch.tx(0).hash())
+        self.assertEqual(batch.prev_tx(0), batch.tx(0).tx_ins[0].prev_tx)
+        self.assertEqual(list(batch.input_counts), [1, 1])
+        self.assertEqual(list(batch.output_counts), [2, 2])
+
+        with self.assertRaises(ValueError):
+            TxBatch.from_raw([RAW_TX + b'\x00'])
+
+    def test_malformed_leaves_batch_unchanged(self):
+        batch = TxBatch()
+        for raw in (RAW_TX[:200], RAW_TX[:3], RAW_TX[:6], RAW_TX + b'\x00'):
+            with self.assertRaises(ValueError):
+                batch.add_raw(raw)
+            self.assertEqual(len(batch), 0)
+
+        batch.add_raw(RAW_TX)
+        self.assertEqual(list(batch.input_counts), [1])
+        self.assertEqual(list(batch.output_counts), [2])
+        self.assertEqual(batch.tx(0).serialize(), RAW_TX)
+
+        with self.assertRaises(ValueError):
+            batch.add_block(self.block[:-10])
+        self.assertEqual(len(batch), 1)
+        self.assertEqual(len(batch.amounts), 2)
+
+    def test_segwit(self):
+        raw = self.spend.serialize()
+        witness = b'\x02\x02\xab\xcd\x01\xef'
+        segwit = raw[:4] + b'\x00\x01' + raw[4:-4] + witness + raw[-4:]
+        block = b'\x00' * 80 + encode_varint(2) + self.coinbase.serialize() + segwit
+
+        batch = TxBatch.from_block(block)
+        self.assertEqual(batch.tx_hash(1), self.spend.hash())
+        self.assertEqual(batch.witness(0), b'')
+        self.assertEqual(batch.witness(1), witness)
+        # Tx has no witnesses, the round trip yields the legacy serialization
+        self.assertEqual(batch.tx(1).serialize(), raw)
+        self.assertEqual(list(batch.fees()), [0, 10000])
+
+    def test_block(self):
+        batch = TxBatch.from_block(self.block)
+        self.assertEqual([tx.serialize() for tx in batch], [self.coinbase.serialize(), self.spend.serialize()])
+        self.assertTrue(batch.is_coinbase(0))
+        self.assertFalse(batch.is_coinbase(1))
+        self.assertEqual(batch.script_pubkey(1), p2pkh(2).serialize()[1:])
+        self.assertEqual(batch.locktimes[1], 100)
+
+    def test_aggregates(self):
+        batch = TxBatch.from_block(self.block)
+        self.assertEqual(batch.total_output_value(), 5000000000 + 4999990000)
+        self.assertEqual(list(batch.output_values()), [5000000000, 4999990000])
+        self.assertEqual(batch.value_histogram([2000000000, 4000000000]), [1, 1, 1])
+        self.assertEqual(sum(batch.value_histogram()), 3)
+        self.assertEqual(batch.value_histogram()[(3000000000).bit_length()], 1)
+
+        self.assertEqual(list(batch.input_values()), [0, 5000000000])
+        self.assertEqual(list(batch.fees()), [0, 10000])
+
+    def test_external_prevouts(self):
+        batch = TxBatch.from_raw([RAW_TX])
+        with self.assertRaises(ValueError):
+            batch.fees()
+
+        prev_tx = batch.tx(0).tx_ins[0].prev_tx
+        values = batch.input_values(lambda tx_hash, ix: 42000000 if (tx_hash, ix) == (prev_tx, 0) else None)
+        self.assertEqual(list(batch.fees(values)), [42000000 - batch.total_output_value()])
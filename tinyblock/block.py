@@ -0,0 +1,123 @@
+from __future__ import annotations # For PEP 563 – Postponed Evaluation of Annotations
+from dataclasses import dataclass
+from typing import BinaryIO
+
+from .utils import hash256
+
+
+__all__ = ['BlockHeader', 'bits_to_target', 'target_to_bits', 'calculate_new_bits']
+
+# Size in bytes of a serialized block header
+HEADER_SIZE = 80
+
+# Network magic, the first bytes of every p2p message and of every record in bitcoind's blk*.dat files
+MAINNET_MAGIC = bytes.fromhex('f9beb4d9')
+TESTNET_MAGIC = bytes.fromhex('0b110907')
+REGTEST_MAGIC = bytes.fromhex('fabfb5da')
+
+# Number of blocks between difficulty adjustments
+RETARGET_INTERVAL = 2016
+
+# Expected number of seconds per difficulty period (two weeks)
+TARGET_TIMESPAN = 60 * 60 * 24 * 14
+
+
+def bits_to_target(bits: bytes) -> int:
+    """
+    Returns the proof-of-work target encoded by the compact bits field
+    """
+    exponent = bits[-1]
+    coefficient = int.from_bytes(bits[:-1], 'little')
+    return coefficient * 256**(exponent - 3)
+
+
+def target_to_bits(target: int) -> bytes:
+    """
+    Encodes a proof-of-work target into the compact bits field
+    """
+    raw_bytes = target.to_bytes(32, 'big').lstrip(b'\x00')
+    if raw_bytes[0] > 0x7f:
+        exponent = len(raw_bytes) + 1
+        coefficient = b'\x00' + raw_bytes[:2]
+    else:
+        exponent = len(raw_bytes)
+        coefficient = raw_bytes[:3]
+
+    return coefficient[::-1] + bytes([exponent])
+
+
+def calculate_new_bits(prev_bits: bytes, time_differential: int, timespan: int = TARGET_TIMESPAN,
+        pow_limit: int = None) -> bytes:
+    """
+    Returns the bits for the next difficulty period given the time taken by the previous one
+    """
+    if time_differential > timespan * 4:
+        time_differential = timespan * 4
+    if time_differential < timespan // 4:
+        time_differential = timespan // 4
+
+    new_target = bits_to_target(prev_bits) * time_differential // timespan
+    if pow_limit is not None and new_target > pow_limit:
+        new_target = pow_limit
+
+    return target_to_bits(new_target)
+
+
+@dataclass
+class BlockHeader:
+    version: int
+    prev_block: bytes
+    merkle_root: bytes
+    timestamp: int
+    bits: bytes
+    nonce: bytes
+
+    def serialize(self) -> bytes:
+        """
+        Returns the 80 byte binary representation of the block header
+        """
+        ser = b''
+        ser += self.version.to_bytes(4, 'little')
+        ser += self.prev_block[::-1]
+        ser += self.merkle_root[::-1]
+        ser += self.timestamp.to_bytes(4, 'little')
+        ser += self.bits
+        ser += self.nonce
+        return ser
+
+    @classmethod
+    def parse(cls, s: BinaryIO) -> BlockHeader:
+        version = int.from_bytes(s.read(4), 'little')
+        prev_block = s.read(32)[::-1]
+        merkle_root = s.read(32)[::-1]
+        timestamp = int.from_bytes(s.read(4), 'little')
+        bits = s.read(4)
+        nonce = s.read(4)
+
+        return cls(version, prev_block, merkle_root, timestamp, bits, nonce)
+
+    def hash(self) -> bytes:
+        """
+        Returns the big endian binary hash of the block header
+        """
+        return hash256(self.serialize())[::-1]
+
+    def id(self) -> str:
+        """
+        Returns a hex encoded hash of the block header
+        """
+        return self.hash().hex()
+
+    def target(self) -> int:
+        return bits_to_target(self.bits)
+
+    def difficulty(self) -> float:
+        lowest = 0xffff * 256**(0x1d - 3)
+        return lowest / self.target()
+
+    def check_pow(self) -> bool:
+        """
+        Returns whether the header hash satisfies its own proof-of-work target (hash <= target)
+        """
+        proof = int.from_bytes(hash256(self.serialize()), 'little')
+        return proof <= self.target()
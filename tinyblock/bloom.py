@@ -0,0 +1,212 @@
+from __future__ import annotations # For PEP 563 – Postponed Evaluation of Annotations
+from io import BytesIO
+from math import log
+from typing import BinaryIO, Iterable, List
+import struct
+
+from .utils import encode_varint, read_varint
+
+
+__all__ = ['BloomFilter', 'murmur3', 'BLOOM_UPDATE_NONE', 'BLOOM_UPDATE_ALL', 'BLOOM_UPDATE_P2PUBKEY_ONLY']
+
+# Multiplier used to derive the seed of each hash function (BIP37)
+BIP37_CONSTANT = 0xfba4c795
+
+MAX_BLOOM_FILTER_SIZE = 36000 # bytes
+MAX_HASH_FUNCS = 50
+
+BLOOM_UPDATE_NONE = 0
+BLOOM_UPDATE_ALL = 1
+BLOOM_UPDATE_P2PUBKEY_ONLY = 2
+
+LN2 = 0.6931471805599453
+LN2_SQUARED = LN2 * LN2
+
+MASK32 = 0xffffffff
+C1 = 0xcc9e2d51
+C2 = 0x1b873593
+
+
+def murmur3(data: bytes, seed: int = 0) -> int:
+    """
+    Returns the 32-bit murmur3 (x86_32) hash of data
+    """
+    length = len(data)
+    h1 = seed & MASK32
+    rounded_end = length & ~3
+
+    for k1 in struct.unpack_from(f'<{rounded_end >> 2}I', data):
+        k1 = (k1 * C1) & MASK32
+        k1 = ((k1 << 15) | (k1 >> 17)) & MASK32
+        k1 = (k1 * C2) & MASK32
+        h1 ^= k1
+        h1 = ((h1 << 13) | (h1 >> 19)) & MASK32
+        h1 = (h1 * 5 + 0xe6546b64) & MASK32
+
+    tail = length & 3
+    if tail:
+        k1 = int.from_bytes(data[rounded_end:], 'little')
+        k1 = (k1 * C1) & MASK32
+        k1 = ((k1 << 15) | (k1 >> 17)) & MASK32
+        k1 = (k1 * C2) & MASK32
+        h1 ^= k1
+
+    h1 ^= length
+    h1 ^= h1 >> 16
+    h1 = (h1 * 0x85ebca6b) & MASK32
+    h1 ^= h1 >> 13
+    h1 = (h1 * 0xc2b2ae35) & MASK32
+    h1 ^= h1 >> 16
+    return h1
+
+
+def _is_pubkey_script(cmds: List) -> bool:
+    # p2pk: <pubkey> OP_CHECKSIG, bare multisig: OP_m <pubkeys...> OP_n OP_CHECKMULTISIG
+    if len(cmds) == 2 and isinstance(cmds[0], bytes) and cmds[1] == 0xac:
+        return True
+    return len(cmds) >= 4 and cmds[-1] == 0xae and all(isinstance(c, bytes) for c in cmds[1:-2])
+
+
+class BloomFilter:
+    """
+    BIP37 bloom filter over a bytearray bit field
+
+    The per-function murmur3 seeds are computed once, so a membership check
+    is just the hash rounds and a byte lookup per function.
+    """
+
+    def __init__(self, size: int, function_count: int, tweak: int = 0, flags: int = BLOOM_UPDATE_NONE):
+        if size > MAX_BLOOM_FILTER_SIZE or function_count > MAX_HASH_FUNCS:
+            raise ValueError(f'filter of {size} bytes with {function_count} functions exceeds BIP37 limits')
+        self.bit_field = bytearray(size)
+        self.function_count = function_count
+        self.tweak = tweak & MASK32
+        self.flags = flags
+        self._seeds = [(i * BIP37_CONSTANT + self.tweak) & MASK32 for i in range(function_count)]
+        self._bits = size * 8
+        self._update_empty_full()
+
+    @classmethod
+    def from_elements(cls, elements: int, fp_rate: float, tweak: int = 0, flags: int = BLOOM_UPDATE_NONE) -> BloomFilter:
+        """
+        Returns an empty filter sized for a number of elements at a false positive rate
+        """
+        bits = min(int(-1 / LN2_SQUARED * elements * log(fp_rate)), MAX_BLOOM_FILTER_SIZE * 8)
+        size = max(bits // 8, 1)
+        function_count = min(int(size * 8 / elements * LN2), MAX_HASH_FUNCS)
+        return cls(size, function_count, tweak, flags)
+
+    def _update_empty_full(self):
+        self._empty = not any(self.bit_field)
+        self._full = self.bit_field.count(0xff) == len(self.bit_field)
+
+    def _indexes(self, item: bytes) -> List[int]:
+        bits = self._bits
+        return [murmur3(item, seed) % bits for seed in self._seeds]
+
+    def add(self, item: bytes):
+        bit_field = self.bit_field
+        for ix in self._indexes(item):
+            bit_field[ix >> 3] |= 1 << (ix & 7)
+        self._empty = False
+
+    def add_many(self, items: Iterable[bytes]):
+        bit_field = self.bit_field
+        bits = self._bits
+        seeds = self._seeds
+        for item in items:
+            for seed in seeds:
+                ix = murmur3(item, seed) % bits
+                bit_field[ix >> 3] |= 1 << (ix & 7)
+            self._empty = False
+
+    def contains(self, item: bytes) -> bool:
+        if self._full:
+            return True
+        if self._empty:
+            return False
+
+        bit_field = self.bit_field
+        bits = self._bits
+        for seed in self._seeds:
+            ix = murmur3(item, seed) % bits
+            if not bit_field[ix >> 3] & (1 << (ix & 7)):
+                return False
+        return True
+
+    def __contains__(self, item: bytes) -> bool:
+        return self.contains(item)
+
+    def match_tx(self, tx) -> bool:
+        """
+        Returns whether a transaction is relevant to the filter (BIP37)
+
+        The txid, every data push of each output script and, for the inputs,
+        the spent outpoint and each data push of the script_sig are checked.
+        Matched outputs are added back to the filter according to `flags`.
+        """
+        if self._full:
+            return True
+        if self._empty:
+            return False
+
+        contains = self.contains
+        tx_hash = tx.hash()
+        matched = contains(tx_hash)
+
+        for ix, tx_out in enumerate(tx.tx_outs):
+            cmds = tx_out.script_pubkey.cmds
+            for cmd in cmds:
+                if type(cmd) is not int and cmd and contains(cmd):
+                    matched = True
+                    if self.flags == BLOOM_UPDATE_ALL or \
+                            (self.flags == BLOOM_UPDATE_P2PUBKEY_ONLY and _is_pubkey_script(cmds)):
+                        self.add(tx_hash + ix.to_bytes(4, 'little'))
+                    break
+
+        if matched:
+            return True
+
+        for tx_in in tx.tx_ins:
+            if contains(tx_in.prev_tx[::-1] + tx_in.tx_ix.to_bytes(4, 'little')):
+                return True
+            for cmd in tx_in.script_sig.cmds:
+                if type(cmd) is not int and cmd and contains(cmd):
+                    return True
+
+        return False
+
+    def serialize(self) -> bytes:
+        """
+        Returns the filterload message payload
+        """
+        ser = b''
+        ser += encode_varint(len(self.bit_field))
+        ser += bytes(self.bit_field)
+        ser += self.function_count.to_bytes(4, 'little')
+        ser += self.tweak.to_bytes(4, 'little')
+        ser += self.flags.to_bytes(1, 'little')
+        return ser
+
+    def filterload(self) -> bytes:
+        return self.serialize()
+
+    @classmethod
+    def parse(cls, s: BinaryIO) -> BloomFilter:
+        size = read_varint(s)
+        bit_field = s.read(size)
+        function_count = int.from_bytes(s.read(4), 'little')
+        tweak = int.from_bytes(s.read(4), 'little')
+        flags = s.read(1)[0]
+
+        bloom = cls(size, function_count, tweak, flags)
+        bloom.bit_field[:] = bit_field
+        bloom._update_empty_full()
+        return bloom
+
+    @classmethod
+    def from_filterload(cls, payload: bytes) -> BloomFilter:
+        return cls.parse(BytesIO(payload))
+
+    def __repr__(self):
+        return f'BloomFilter(size={len(self.bit_field)}, function_count={self.function_count}, tweak={self.tweak})'
@@ -0,0 +1,360 @@
+from __future__ import annotations # For PEP 563 – Postponed Evaluation of Annotations
+from array import array
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Dict, List, Optional, Tuple, Union
+import mmap
+import os
+
+from .block import BlockHeader, HEADER_SIZE, RETARGET_INTERVAL, TARGET_TIMESPAN, bits_to_target, calculate_new_bits
+from .utils import hash256
+
+
+__all__ = ['ChainParams', 'HeaderChain', 'MAINNET', 'TESTNET', 'REGTEST', 'check_pow_batch']
+
+
+@dataclass(frozen=True)
+class ChainParams:
+    """
+    Consensus parameters needed to validate a header chain
+    """
+    genesis: bytes
+    pow_limit: int
+    retarget_interval: int = RETARGET_INTERVAL
+    target_timespan: int = TARGET_TIMESPAN
+    no_retargeting: bool = False
+    allow_min_difficulty: bool = False
+
+
+MAINNET = ChainParams(
+    genesis=bytes.fromhex('0100000000000000000000000000000000000000000000000000000000000000000000003ba3edfd7a7b12b27ac72c3e67768f617fc81bc3888a51323a9fb8aa4b1e5e4a29ab5f49ffff001d1dac2b7c'),
+    pow_limit=0xffff * 256**(0x1d - 3),
+)
+
+TESTNET = ChainParams(
+    genesis=bytes.fromhex('0100000000000000000000000000000000000000000000000000000000000000000000003ba3edfd7a7b12b27ac72c3e67768f617fc81bc3888a51323a9fb8aa4b1e5e4adae5494dffff001d1aa4ae18'),
+    pow_limit=0xffff * 256**(0x1d - 3),
+    allow_min_difficulty=True,
+)
+
+REGTEST = ChainParams(
+    genesis=bytes.fromhex('0100000000000000000000000000000000000000000000000000000000000000000000003ba3edfd7a7b12b27ac72c3e67768f617fc81bc3888a51323a9fb8aa4b1e5e4adae5494dffff7f2002000000'),
+    pow_limit=0x7fffff * 256**(0x20 - 3),
+    no_retargeting=True,
+)
+
+
+def check_pow_batch(raw: Union[bytes, bytearray, memoryview], pow_limit: int = None) -> List[bytes]:
+    """
+    Checks the proof-of-work of concatenated 80 byte headers and returns their (little endian) hashes
+
+    Targets are decoded once per distinct bits value, so a batch within a single
+    difficulty period costs one hash and one integer comparison per header.
+    """
+    view = memoryview(raw)
+    if len(view) % HEADER_SIZE:
+        raise ValueError(f'header data length {len(view)} is not a multiple of {HEADER_SIZE}')
+
+    targets: Dict[bytes, int] = {}
+    hashes = []
+    for offset in range(0, len(view), HEADER_SIZE):
+        bits = bytes(view[offset + 72:offset + 76])
+        target = targets.get(bits)
+        if target is None:
+            target = bits_to_target(bits)
+            if pow_limit is not None and target > pow_limit:
+                raise ValueError(f'header {offset // HEADER_SIZE} target above the proof-of-work limit')
+            targets[bits] = target
+
+        h = hash256(view[offset:offset + HEADER_SIZE])
+        if int.from_bytes(h, 'little') > target:
+            raise ValueError(f'header {offset // HEADER_SIZE} does not satisfy its proof-of-work target')
+        hashes.append(h)
+
+    return hashes
+
+
+class HeaderChain:
+    """
+    Append-only store of block headers with main chain and fork tracking
+
+    Raw headers live back to back in a single buffer (a bytearray, or a memory
+    mapped file when `path` is given), addressed by slot number. Per slot only
+    the height, parent slot, timestamp, bits and cumulative work are kept in
+    compact arrays; the main chain is a height to slot array and the only
+    per-header Python objects are the keys of the hash to slot dict.
+    """
+
+    def __init__(self, params: ChainParams = MAINNET, path: str = None):
+        self.params = params
+        self.path = path
+
+        self._raw = bytearray()
+        self._file = None
+        self._mm = None
+        self._mapped = 0
+        self._size = 0
+
+        self._slots: Dict[bytes, int] = {}
+        self._heights = array('I')
+        self._parents = array('i')
+        self._timestamps = array('I')
+        self._bits = array('I')
+        self._work = bytearray()
+        self._main = array('I')
+        self._leaves = set()
+        self._tip = 0
+        self._targets: Dict[bytes, int] = {}
+
+        if path is not None:
+            existed = os.path.exists(path) and os.path.getsize(path) > 0
+            self._file = open(path, 'r+b' if existed else 'w+b')
+            if existed:
+                self._load()
+                return
+
+        self._append_raw(params.genesis)
+        self._index(hash256(params.genesis), params.genesis, -1)
+
+    def _load(self):
+        size = os.fstat(self._file.fileno()).st_size
+        if size % HEADER_SIZE:
+            raise ValueError(f'header file {self.path} is truncated')
+
+        self._size = size
+        data = self._buffer()
+        if bytes(data[:HEADER_SIZE]) != self.params.genesis:
+            raise ValueError(f'header file {self.path} does not start with the expected genesis')
+
+        # Headers were validated before being written, only the indexes need rebuilding
+        for slot in range(size // HEADER_SIZE):
+            raw = data[slot * HEADER_SIZE:(slot + 1) * HEADER_SIZE]
+            parent = -1 if slot == 0 else self._slots[bytes(raw[4:36])]
+            self._index(hash256(raw), raw, parent)
+
+    def _buffer(self) -> Union[bytearray, mmap.mmap]:
+        if self._file is None:
+            return self._raw
+
+        if self._mapped < self._size:
+            if self._mm is not None:
+                self._mm.close()
+            self._file.flush()
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._mapped = self._size
+        return self._mm
+
+    def _append_raw(self, raw: Union[bytes, memoryview]):
+        if self._file is None:
+            self._raw += raw
+        else:
+            self._file.seek(self._size)
+            self._file.write(raw)
+        self._size += len(raw)
+
+    def _index(self, h: bytes, raw: Union[bytes, memoryview], parent: int) -> int:
+        slot = len(self._heights)
+        bits = bytes(raw[72:76])
+        work = 2**256 // (self._target(bits) + 1)
+
+        if parent < 0:
+            height = 0
+        else:
+            height = self._heights[parent] + 1
+            work += self._chainwork(parent)
+            self._leaves.discard(parent)
+
+        self._slots[h] = slot
+        self._heights.append(height)
+        self._parents.append(parent)
+        self._timestamps.append(int.from_bytes(raw[68:72], 'little'))
+        self._bits.append(int.from_bytes(bits, 'little'))
+        self._work += work.to_bytes(32, 'big')
+        self._leaves.add(slot)
+
+        if parent < 0:
+            self._main.append(slot)
+        elif work > self._chainwork(self._tip):
+            self._set_tip(slot)
+        return slot
+
+    def _set_tip(self, slot: int):
+        if self._parents[slot] == self._tip:
+            self._main.append(slot)
+            self._tip = slot
+            return
+
+        # Reorganize: walk back to the fork point, then rewrite the main chain above it
+        branch = []
+        curr = slot
+        while self._main_slot(self._heights[curr]) != curr:
+            branch.append(curr)
+            curr = self._parents[curr]
+
+        del self._main[self._heights[curr] + 1:]
+        self._main.extend(reversed(branch))
+        self._tip = slot
+
+    def _main_slot(self, height: int) -> int:
+        if height < len(self._main):
+            return self._main[height]
+        return -1
+
+    def _target(self, bits: bytes) -> int:
+        target = self._targets.get(bits)
+        if target is None:
+            target = bits_to_target(bits)
+            self._targets[bits] = target
+        return target
+
+    def _chainwork(self, slot: int) -> int:
+        return int.from_bytes(self._work[slot * 32:(slot + 1) * 32], 'big')
+
+    def _ancestor(self, slot: int, height: int) -> int:
+        if self._main_slot(self._heights[slot]) == slot:
+            return self._main[height]
+
+        while self._heights[slot] > height:
+            slot = self._parents[slot]
+        return slot
+
+    def _expected_bits(self, parent: int, bits: bytes) -> Optional[bytes]:
+        params = self.params
+        parent_bits = self._bits[parent].to_bytes(4, 'little')
+        height = self._heights[parent] + 1
+
+        if params.no_retargeting:
+            return parent_bits
+
+        if height % params.retarget_interval != 0:
+            if params.allow_min_difficulty:
+                # Testnet permits minimum difficulty blocks between retargets
+                return None
+            return parent_bits
+
+        first = self._ancestor(parent, height - params.retarget_interval)
+        time_differential = self._timestamps[parent] - self._timestamps[first]
+        return calculate_new_bits(parent_bits, time_differential, params.target_timespan, params.pow_limit)
+
+    def add_header(self, header: BlockHeader) -> int:
+        return self.add_headers(header.serialize())
+
+    def add_headers(self, raw: Union[bytes, bytearray, memoryview]) -> int:
+        """
+        Validates and stores concatenated 80 byte headers, returns the number of new headers
+
+        Proof-of-work for the whole batch is checked before anything is stored.
+        Linkage and difficulty are checked per header; headers accepted before a
+        failing one are kept.
+        """
+        view = memoryview(raw)
+        hashes = check_pow_batch(view, self.params.pow_limit)
+
+        added = 0
+        for i, h in enumerate(hashes):
+            if h in self._slots:
+                continue
+
+            header = view[i * HEADER_SIZE:(i + 1) * HEADER_SIZE]
+            parent = self._slots.get(bytes(header[4:36]))
+            if parent is None:
+                raise ValueError(f'header {h[::-1].hex()} does not connect to a known header')
+
+            bits = bytes(header[72:76])
+            expected = self._expected_bits(parent, bits)
+            if expected is not None and expected != bits:
+                raise ValueError(f'header {h[::-1].hex()} has bits {bits.hex()}, expected {expected.hex()}')
+
+            self._append_raw(header)
+            self._index(h, header, parent)
+            added += 1
+
+        return added
+
+    @property
+    def height(self) -> int:
+        return len(self._main) - 1
+
+    @property
+    def tip(self) -> bytes:
+        """
+        Returns the big endian hash of the main chain tip
+        """
+        return self.block_hash(self.height)
+
+    def __len__(self) -> int:
+        return len(self._main)
+
+    def __contains__(self, block_hash: bytes) -> bool:
+        return block_hash[::-1] in self._slots
+
+    def offset(self, height: int) -> int:
+        """
+        Returns the byte offset in the header store of the main chain header at height
+        """
+        if height < 0 or height > self.height:
+            raise IndexError(f'height {height} out of range 0 to {self.height}')
+        return self._main[height] * HEADER_SIZE
+
+    def raw_header(self, height: int) -> bytes:
+        offset = self.offset(height)
+        return bytes(self._buffer()[offset:offset + HEADER_SIZE])
+
+    def header(self, height: int) -> BlockHeader:
+        return BlockHeader.parse(BytesIO(self.raw_header(height)))
+
+    def block_hash(self, height: int) -> bytes:
+        return hash256(self.raw_header(height))[::-1]
+
+    def get_height(self, block_hash: bytes) -> Optional[int]:
+        """
+        Returns the main chain height of a block hash or None when it is unknown or on a fork
+        """
+        slot = self._slots.get(block_hash[::-1])
+        if slot is None or self._main_slot(self._heights[slot]) != slot:
+            return None
+        return self._heights[slot]
+
+    def chainwork(self, height: int = None) -> int:
+        if height is None:
+            height = self.height
+        return self._chainwork(self.offset(height) // HEADER_SIZE)
+
+    def tips(self) -> List[Tuple[bytes, int]]:
+        """
+        Returns (hash, height) of every chain tip, the main chain tip first
+        """
+        buf = self._buffer()
+        leaves = sorted(self._leaves, key=self._chainwork, reverse=True)
+        return [
+            (hash256(buf[s * HEADER_SIZE:(s + 1) * HEADER_SIZE])[::-1], self._heights[s]) for s in leaves
+        ]
+
+    def locator(self) -> List[bytes]:
+        """
+        Returns a block locator (dense near the tip, exponentially sparser below) for getheaders
+        """
+        hashes = []
+        step = 1
+        height = self.height
+        while height > 0:
+            hashes.append(self.block_hash(height))
+            if len(hashes) >= 10:
+                step *= 2
+            height -= step
+        hashes.append(self.block_hash(0))
+        return hashes
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> HeaderChain:
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
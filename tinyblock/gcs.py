@@ -0,0 +1,260 @@
+from __future__ import annotations # For PEP 563 – Postponed Evaluation of Annotations
+from io import BytesIO
+from typing import Iterable, List
+import struct
+
+from .script import Script
+from .utils import encode_varint, hash256, read_varint
+
+
+__all__ = ['BitWriter', 'BitReader', 'GCSFilter', 'siphash', 'build_basic_filter', 'match_any', 'filter_header']
+
+# BIP158 basic filter parameters
+BASIC_FILTER_P = 19
+BASIC_FILTER_M = 784931
+
+MASK64 = 0xffffffffffffffff
+
+OP_RETURN = 0x6a
+
+
+def _rotl(x: int, b: int) -> int:
+    return ((x << b) | (x >> (64 - b))) & MASK64
+
+
+def siphash(key: bytes, data: bytes) -> int:
+    """
+    Returns the SipHash-2-4 of data under a 16 byte key as an integer
+    """
+    k0, k1 = struct.unpack('<QQ', key)
+    v0 = k0 ^ 0x736f6d6570736575
+    v1 = k1 ^ 0x646f72616e646f6d
+    v2 = k0 ^ 0x6c7967656e657261
+    v3 = k1 ^ 0x7465646279746573
+
+    length = len(data)
+    end = length & ~7
+    tail = int.from_bytes(data[end:], 'little') | ((length & 0xff) << 56)
+
+    for m in struct.unpack_from(f'<{end >> 3}Q', data) + (tail,):
+        v3 ^= m
+        for _ in range(2):
+            v0 = (v0 + v1) & MASK64; v1 = _rotl(v1, 13); v1 ^= v0; v0 = _rotl(v0, 32)
+            v2 = (v2 + v3) & MASK64; v3 = _rotl(v3, 16); v3 ^= v2
+            v0 = (v0 + v3) & MASK64; v3 = _rotl(v3, 21); v3 ^= v0
+            v2 = (v2 + v1) & MASK64; v1 = _rotl(v1, 17); v1 ^= v2; v2 = _rotl(v2, 32)
+        v0 ^= m
+
+    v2 ^= 0xff
+    for _ in range(4):
+        v0 = (v0 + v1) & MASK64; v1 = _rotl(v1, 13); v1 ^= v0; v0 = _rotl(v0, 32)
+        v2 = (v2 + v3) & MASK64; v3 = _rotl(v3, 16); v3 ^= v2
+        v0 = (v0 + v3) & MASK64; v3 = _rotl(v3, 21); v3 ^= v0
+        v2 = (v2 + v1) & MASK64; v1 = _rotl(v1, 17); v1 ^= v2; v2 = _rotl(v2, 32)
+
+    return v0 ^ v1 ^ v2 ^ v3
+
+
+class BitWriter:
+    """
+    Writes bits most significant first into a bytearray
+    """
+
+    def __init__(self):
+        self.data = bytearray()
+        self._acc = 0
+        self._nbits = 0
+
+    def write_bits(self, value: int, nbits: int):
+        self._acc = (self._acc << nbits) | value
+        self._nbits += nbits
+        while self._nbits >= 8:
+            self._nbits -= 8
+            self.data.append((self._acc >> self._nbits) & 0xff)
+        self._acc &= (1 << self._nbits) - 1
+
+    def write_unary(self, n: int):
+        self.write_bits(((1 << n) - 1) << 1, n + 1)
+
+    def write_golomb_rice(self, value: int, p: int):
+        self.write_unary(value >> p)
+        self.write_bits(value & ((1 << p) - 1), p)
+
+    def flush(self) -> bytes:
+        """
+        Returns the written bits padded with zeros to a whole byte
+        """
+        if self._nbits:
+            self.data.append((self._acc << (8 - self._nbits)) & 0xff)
+            self._acc = 0
+            self._nbits = 0
+        return bytes(self.data)
+
+
+class BitReader:
+    """
+    Reads bits most significant first from a byte string
+    """
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+
+    def read_bits(self, nbits: int) -> int:
+        pos = self.pos
+        start = pos >> 3
+        end = (pos + nbits + 7) >> 3
+        if end > len(self.data):
+            raise EOFError('read past the end of the bit stream')
+
+        chunk = int.from_bytes(self.data[start:end], 'big')
+        self.pos = pos + nbits
+        return (chunk >> ((end << 3) - pos - nbits)) & ((1 << nbits) - 1)
+
+    def read_unary(self) -> int:
+        data = self.data
+        pos = self.pos
+        n = 0
+        while True:
+            if pos >> 3 >= len(data):
+                raise EOFError('read past the end of the bit stream')
+            if not (data[pos >> 3] >> (7 - (pos & 7))) & 1:
+                break
+            n += 1
+            pos += 1
+        self.pos = pos + 1
+        return n
+
+    def read_golomb_rice(self, p: int) -> int:
+        q = self.read_unary()
+        return (q << p) | self.read_bits(p)
+
+
+class GCSFilter:
+    """
+    A Golomb-coded set of items hashed to a block specific range (BIP158)
+    """
+
+    def __init__(self, n: int, data: bytes, key: bytes, p: int = BASIC_FILTER_P, m: int = BASIC_FILTER_M):
+        self.n = n
+        self.data = data
+        self.key = key
+        self.p = p
+        self.m = m
+
+    @classmethod
+    def build(cls, key: bytes, items: Iterable[bytes], p: int = BASIC_FILTER_P, m: int = BASIC_FILTER_M) -> GCSFilter:
+        items = set(items)
+        n = len(items)
+        f = n * m
+
+        writer = BitWriter()
+        last = 0
+        for value in sorted((siphash(key, item) * f) >> 64 for item in items):
+            writer.write_golomb_rice(value - last, p)
+            last = value
+
+        return cls(n, writer.flush(), key, p, m)
+
+    @classmethod
+    def parse(cls, block_hash: bytes, raw: bytes, p: int = BASIC_FILTER_P, m: int = BASIC_FILTER_M) -> GCSFilter:
+        """
+        Parses a serialized filter for the block with the big endian hash block_hash
+        """
+        s = BytesIO(raw)
+        n = read_varint(s)
+        return cls(n, s.read(), block_hash[::-1][:16], p, m)
+
+    def serialize(self) -> bytes:
+        return encode_varint(self.n) + self.data
+
+    def hashed_range(self) -> int:
+        return self.n * self.m
+
+    def values(self) -> List[int]:
+        """
+        Decodes the sorted set of hashed values
+        """
+        reader = BitReader(self.data)
+        values = []
+        last = 0
+        for _ in range(self.n):
+            last += reader.read_golomb_rice(self.p)
+            values.append(last)
+        return values
+
+    def match(self, item: bytes) -> bool:
+        return match_any(self, [item])
+
+    def match_any(self, items: Iterable[bytes]) -> bool:
+        return match_any(self, items)
+
+
+def match_any(gcs: GCSFilter, items: Iterable[bytes]) -> bool:
+    """
+    Returns whether any of items is (probably) in the filter
+
+    The query set is hashed and sorted once, then merged against the filter
+    while it is decoded, so the filter is walked at most once for all items.
+    """
+    if gcs.n == 0:
+        return False
+
+    f = gcs.hashed_range()
+    key = gcs.key
+    queries = sorted((siphash(key, item) * f) >> 64 for item in items)
+    if not queries:
+        return False
+
+    p = gcs.p
+    reader = BitReader(gcs.data)
+    value = 0
+    qi = 0
+    nq = len(queries)
+    for _ in range(gcs.n):
+        value += reader.read_golomb_rice(p)
+        query = queries[qi]
+        while query < value:
+            qi += 1
+            if qi == nq:
+                return False
+            query = queries[qi]
+        if query == value:
+            return True
+
+    return False
+
+
+def _script_bytes(script: Script) -> bytes:
+    s = BytesIO(script.serialize())
+    length = read_varint(s)
+    return s.read(length)
+
+
+def build_basic_filter(block_hash: bytes, txs: Iterable, prevout_scripts: Iterable[Script] = ()) -> GCSFilter:
+    """
+    Builds the basic filter of a block from its transactions and the scripts of the outputs they spend
+
+    block_hash is big endian, as returned by BlockHeader.hash(). prevout_scripts
+    must not include anything for the coinbase input.
+    """
+    items = set()
+    for tx in txs:
+        for tx_out in tx.tx_outs:
+            raw = _script_bytes(tx_out.script_pubkey)
+            if raw and raw[0] != OP_RETURN:
+                items.add(raw)
+
+    for script in prevout_scripts:
+        raw = _script_bytes(script)
+        if raw:
+            items.add(raw)
+
+    return GCSFilter.build(block_hash[::-1][:16], items)
+
+
+def filter_header(gcs: GCSFilter, prev_header: bytes) -> bytes:
+    """
+    Returns the filter header chaining this filter to the previous block's filter header
+    """
+    return hash256(hash256(gcs.serialize()) + prev_header)
@@ -0,0 +1,244 @@
+from __future__ import annotations # For PEP 563 – Postponed Evaluation of Annotations
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Tuple, Union
+import hashlib
+import hmac
+
+from .secp256kl import N, PrivateKey, S256Point, generator_multiply_many
+from .utils import checksum_base58, decode_checksum_base58, hash160
+
+
+__all__ = ['ExtendedPrivateKey', 'ExtendedPublicKey', 'parse_path', 'HARDENED']
+
+HARDENED = 0x80000000
+
+XPRV_MAINNET = bytes.fromhex('0488ade4')
+XPUB_MAINNET = bytes.fromhex('0488b21e')
+XPRV_TESTNET = bytes.fromhex('04358394')
+XPUB_TESTNET = bytes.fromhex('043587cf')
+
+Path = Tuple[int, ...]
+
+
+def parse_path(path: Union[str, Iterable[int]]) -> Path:
+    """
+    Parses a derivation path such as m/44'/0'/0'/0/5 (h or H also mark hardened indexes)
+    """
+    if not isinstance(path, str):
+        return tuple(path)
+
+    parts = path.strip().split('/')
+    if parts[0] in ('m', 'M'):
+        parts = parts[1:]
+
+    indexes = []
+    for part in parts:
+        if not part:
+            continue
+        hardened = part[-1] in "'hH"
+        index = int(part[:-1] if hardened else part)
+        if index < 0 or index >= HARDENED:
+            raise ValueError(f'child index {part} out of range')
+        indexes.append(index + HARDENED if hardened else index)
+    return tuple(indexes)
+
+
+def _child_tweak(mac, data: bytes) -> Tuple[int, bytes]:
+    mac = mac.copy()
+    mac.update(data)
+    i = mac.digest()
+    tweak = int.from_bytes(i[:32], 'big')
+    if tweak >= N:
+        raise ValueError('invalid child, proceed with the next index')
+    return tweak, i[32:]
+
+
+@dataclass
+class ExtendedPublicKey:
+    point: S256Point
+    chain_code: bytes
+    depth: int = 0
+    parent_fingerprint: bytes = b'\x00\x00\x00\x00'
+    child_number: int = 0
+    testnet: bool = False
+    _cache: Dict[Path, ExtendedPublicKey] = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    def sec(self) -> bytes:
+        return self.point.to_sec(compressed=True)
+
+    def fingerprint(self) -> bytes:
+        return hash160(self.sec())[:4]
+
+    def child(self, index: int) -> ExtendedPublicKey:
+        return self.children([index])[0]
+
+    def children(self, indexes: Iterable[int]) -> List[ExtendedPublicKey]:
+        """
+        Derives non-hardened children, computing the parent's SEC, fingerprint and HMAC key once
+
+        Each child point is parent_point + I_L*G, computed in Jacobian coordinates from the
+        fixed-base table of G, and the whole batch is normalized with a single inversion.
+        """
+        sec = self.sec()
+        fingerprint = hash160(sec)[:4]
+        mac = hmac.new(self.chain_code, digestmod=hashlib.sha512)
+
+        indexes = list(indexes)
+        tweaks, chain_codes = [], []
+        for index in indexes:
+            if index >= HARDENED:
+                raise ValueError('cannot derive a hardened child from a public key')
+            tweak, chain_code = _child_tweak(mac, sec + index.to_bytes(4, 'big'))
+            tweaks.append(tweak)
+            chain_codes.append(chain_code)
+
+        children = []
+        for index, point, chain_code in zip(indexes, generator_multiply_many(tweaks, self.point), chain_codes):
+            if point.x is None:
+                raise ValueError('invalid child, proceed with the next index')
+            children.append(self.__class__(point, chain_code, self.depth + 1, fingerprint, index, self.testnet))
+        return children
+
+    def derive(self, path: Union[str, Iterable[int]]) -> ExtendedPublicKey:
+        """
+        Derives a descendant, reusing every intermediate node already derived from this key
+        """
+        path = parse_path(path)
+        node = self
+        for i in range(len(path)):
+            prefix = path[:i + 1]
+            cached = self._cache.get(prefix)
+            if cached is None:
+                cached = node.child(path[i])
+                self._cache[prefix] = cached
+            node = cached
+        return node
+
+    def derive_range(self, path: Union[str, Iterable[int]], indexes: Iterable[int]) -> List[ExtendedPublicKey]:
+        """
+        Derives path/i for every i in indexes, the shared path prefix is derived once
+        """
+        return self.derive(path).children(indexes)
+
+    def serialize(self) -> str:
+        version = XPUB_TESTNET if self.testnet else XPUB_MAINNET
+        return checksum_base58(
+            version + bytes([self.depth]) + self.parent_fingerprint + self.child_number.to_bytes(4, 'big')
+            + self.chain_code + self.sec()
+        )
+
+    @classmethod
+    def parse(cls, s: str) -> ExtendedPublicKey:
+        raw = decode_checksum_base58(s)
+        if len(raw) != 78 or raw[:4] not in (XPUB_MAINNET, XPUB_TESTNET):
+            raise ValueError(f'{s} is not an extended public key')
+        return cls(
+            S256Point.from_sec(raw[45:]), raw[13:45], raw[4], raw[5:9], int.from_bytes(raw[9:13], 'big'),
+            raw[:4] == XPUB_TESTNET,
+        )
+
+
+@dataclass
+class ExtendedPrivateKey:
+    private_key: PrivateKey
+    chain_code: bytes
+    depth: int = 0
+    parent_fingerprint: bytes = b'\x00\x00\x00\x00'
+    child_number: int = 0
+    testnet: bool = False
+    _cache: Dict[Path, ExtendedPrivateKey] = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    @classmethod
+    def from_seed(cls, seed: bytes, testnet: bool = False) -> ExtendedPrivateKey:
+        i = hmac.new(b'Bitcoin seed', seed, hashlib.sha512).digest()
+        secret = int.from_bytes(i[:32], 'big')
+        if secret == 0 or secret >= N:
+            raise ValueError('invalid master key, use another seed')
+        return cls(PrivateKey(secret), i[32:], testnet=testnet)
+
+    @property
+    def point(self) -> S256Point:
+        return self.private_key.point
+
+    def sec(self) -> bytes:
+        return self.point.to_sec(compressed=True)
+
+    def fingerprint(self) -> bytes:
+        return hash160(self.sec())[:4]
+
+    def public_key(self) -> ExtendedPublicKey:
+        return ExtendedPublicKey(
+            self.point, self.chain_code, self.depth, self.parent_fingerprint, self.child_number, self.testnet
+        )
+
+    def child(self, index: int) -> ExtendedPrivateKey:
+        return self.children([index])[0]
+
+    def children(self, indexes: Iterable[int]) -> List[ExtendedPrivateKey]:
+        """
+        Derives children, computing the parent's SEC, fingerprint and HMAC key once
+
+        The child public points are computed together with a single shared inversion.
+        """
+        secret = self.private_key.secret
+        sec = self.sec()
+        fingerprint = hash160(sec)[:4]
+        mac = hmac.new(self.chain_code, digestmod=hashlib.sha512)
+        ser_secret = b'\x00' + secret.to_bytes(32, 'big')
+
+        indexes = list(indexes)
+        secrets, chain_codes = [], []
+        for index in indexes:
+            data = ser_secret if index >= HARDENED else sec
+            tweak, chain_code = _child_tweak(mac, data + index.to_bytes(4, 'big'))
+            child_secret = (tweak + secret) % N
+            if child_secret == 0:
+                raise ValueError('invalid child, proceed with the next index')
+            secrets.append(child_secret)
+            chain_codes.append(chain_code)
+
+        children = []
+        points = generator_multiply_many(secrets)
+        for index, child_secret, point, chain_code in zip(indexes, secrets, points, chain_codes):
+            children.append(self.__class__(
+                PrivateKey._from_point(child_secret, point), chain_code, self.depth + 1, fingerprint, index, self.testnet,
+            ))
+        return children
+
+    def derive(self, path: Union[str, Iterable[int]]) -> ExtendedPrivateKey:
+        """
+        Derives a descendant, reusing every intermediate node already derived from this key
+        """
+        path = parse_path(path)
+        node = self
+        for i in range(len(path)):
+            prefix = path[:i + 1]
+            cached = self._cache.get(prefix)
+            if cached is None:
+                cached = node.child(path[i])
+                self._cache[prefix] = cached
+            node = cached
+        return node
+
+    def derive_range(self, path: Union[str, Iterable[int]], indexes: Iterable[int]) -> List[ExtendedPrivateKey]:
+        """
+        Derives path/i for every i in indexes, the shared path prefix is derived once
+        """
+        return self.derive(path).children(indexes)
+
+    def serialize(self) -> str:
+        version = XPRV_TESTNET if self.testnet else XPRV_MAINNET
+        return checksum_base58(
+            version + bytes([self.depth]) + self.parent_fingerprint + self.child_number.to_bytes(4, 'big')
+            + self.chain_code + b'\x00' + self.private_key.secret.to_bytes(32, 'big')
+        )
+
+    @classmethod
+    def parse(cls, s: str) -> ExtendedPrivateKey:
+        raw = decode_checksum_base58(s)
+        if len(raw) != 78 or raw[:4] not in (XPRV_MAINNET, XPRV_TESTNET) or raw[45] != 0:
+            raise ValueError(f'{s} is not an extended private key')
+        return cls(
+            PrivateKey(int.from_bytes(raw[46:], 'big')), raw[13:45], raw[4], raw[5:9],
+            int.from_bytes(raw[9:13], 'big'), raw[:4] == XPRV_TESTNET,
+        )
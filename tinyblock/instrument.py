@@ -0,0 +1,236 @@
+"""
+Opt-in operation counters for the ecc, hashing, script and fetch hot paths
+
+Nothing is wrapped until `enable()` is called: the counting versions of the
+instrumented methods and functions are swapped in on enable and the originals
+restored on disable, so disabled code runs exactly as if this module did not
+exist.
+
+    from tinyblock import instrument
+
+    with instrument.profile() as prof:
+        key.point.is_valid(z, sig)
+    print(prof.counts['field.inv'], prof.counts['point.double'])
+
+Curve arithmetic runs on two paths with their own counters:
+
+- FieldElement/Point objects (variable-base k*P, affine additions):
+  field.mul, field.scalar_mul, field.pow, field.inv, point.add, point.double,
+  point.scalar_mul
+- integer Jacobian coordinates (fixed-base k*G in generator_multiply,
+  signing, HD derivation): point.generator_mul per multiplication,
+  point.jacobian_add and point.jacobian_double per table step, and
+  batch_inverse, which counts one field.inv, 3 field.mul per value and
+  field.batch_inv_values
+"""
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+from types import FunctionType
+from typing import Callable, Dict, Iterator, List, Tuple
+import sys
+import time
+
+from . import ecc, opcodes, secp256kl, tx, utils
+
+
+__all__ = ['enable', 'disable', 'is_enabled', 'snapshot', 'reset', 'profile', 'Profile', 'COUNTERS']
+
+COUNTERS: Counter = Counter()
+
+# (owner, attribute name, original value) of everything currently patched
+_patches: List[Tuple[object, str, object]] = []
+
+# Function wrapper to the original it replaced, for modules imported while enabled
+_wrapped: Dict[Callable, Callable] = {}
+
+
+def _patch(owner, name: str, wrapper: Callable):
+    _patches.append((owner, name, owner.__dict__[name]))
+    setattr(owner, name, wrapper)
+
+
+def _count(key: str, fn: Callable) -> Callable:
+    @wraps(fn)
+    def counted(*args, **kwargs):
+        COUNTERS[key] += 1
+        return fn(*args, **kwargs)
+    return counted
+
+
+def _field_div(fn: Callable) -> Callable:
+    @wraps(fn)
+    def div(self, other):
+        COUNTERS['field.inv'] += 1
+        COUNTERS['field.mul'] += 1
+        return fn(self, other)
+    return div
+
+
+def _point_add(fn: Callable) -> Callable:
+    @wraps(fn)
+    def add(self, other):
+        if self.x is not None and other.x is not None and self.x == other.x and self.y == other.y:
+            COUNTERS['point.double'] += 1
+        else:
+            COUNTERS['point.add'] += 1
+        return fn(self, other)
+    return add
+
+
+def _batch_inverse(fn: Callable) -> Callable:
+    @wraps(fn)
+    def batch_inverse(values, modulus):
+        # One real inversion, plus three multiplications per value (prefix products and unwinding)
+        COUNTERS['field.inv'] += 1
+        COUNTERS['field.mul'] += 3 * len(values)
+        COUNTERS['field.batch_inv_values'] += len(values)
+        return fn(values, modulus)
+    return batch_inverse
+
+
+def _hash(name: str, fn: Callable) -> Callable:
+    @wraps(fn)
+    def hashed(s):
+        COUNTERS[f'hash.{name}.calls'] += 1
+        COUNTERS[f'hash.{name}.bytes'] += len(s)
+        return fn(s)
+    return hashed
+
+
+def _timed(key: str, fn: Callable) -> Callable:
+    @wraps(fn)
+    def timed(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            COUNTERS[key] += time.perf_counter() - start
+    return timed
+
+
+def _read_cache(fn: Callable) -> Callable:
+    @wraps(fn)
+    def read_cache(cls, tx_id):
+        raw = fn(cls, tx_id)
+        COUNTERS['fetcher.misses' if raw is None else 'fetcher.hits'] += 1
+        return raw
+    return read_cache
+
+
+def _patch_function(module, name: str, wrapper: Callable):
+    # Modules bind utils functions by name at import, so rebind every copy of the original
+    original = module.__dict__[name]
+    _wrapped[wrapper] = original
+    for mod in list(sys.modules.values()):
+        if getattr(mod, '__name__', '').startswith('tinyblock') and mod.__dict__.get(name) is original:
+            _patch(mod, name, wrapper)
+
+
+def is_enabled() -> bool:
+    return bool(_patches)
+
+
+def enable():
+    """
+    Swaps the counting wrappers in, a no-op when already enabled
+    """
+    if _patches:
+        return
+
+    field = ecc.FieldElement
+    _patch(field, '__mul__', _count('field.mul', field.__mul__))
+    _patch(field, '__rmul__', _count('field.scalar_mul', field.__rmul__))
+    _patch(field, '__pow__', _count('field.pow', field.__pow__))
+    _patch(field, '__truediv__', _field_div(field.__truediv__))
+
+    point = ecc.Point
+    _patch(point, '__add__', _point_add(point.__add__))
+    _patch(point, '__rmul__', _count('point.scalar_mul', point.__rmul__))
+    # Every fixed-base multiplication (k*G, signing nonces, HD children) goes through the Jacobian path
+    _patch_function(
+        secp256kl, 'generator_multiply_jacobian', _count('point.generator_mul', secp256kl.generator_multiply_jacobian)
+    )
+    _patch_function(secp256kl, 'batch_inverse', _batch_inverse(secp256kl.batch_inverse))
+    _patch_function(secp256kl, '_jacobian_add_affine', _count('point.jacobian_add', secp256kl._jacobian_add_affine))
+    _patch_function(secp256kl, '_jacobian_double', _count('point.jacobian_double', secp256kl._jacobian_double))
+
+    _patch_function(utils, 'hash256', _hash('hash256', utils.hash256))
+    _patch_function(utils, 'hash160', _hash('hash160', utils.hash160))
+
+    # The dict is shared with Script.eval, so its values are replaced in place
+    for code, fn in list(opcodes.OP_CODE_FUNCTIONS.items()):
+        _patches.append((opcodes.OP_CODE_FUNCTIONS, code, fn))
+        opcodes.OP_CODE_FUNCTIONS[code] = _count(f'opcode.{fn.__name__}', fn)
+
+    fetcher = tx.TxFetcher
+    _patch(fetcher, 'fetch', classmethod(_count('fetcher.calls', _timed('fetcher.seconds', fetcher.fetch.__func__))))
+    _patch(fetcher, 'read_cache', classmethod(_read_cache(fetcher.read_cache.__func__)))
+    _patch(fetcher, 'download', staticmethod(_timed('fetcher.download_seconds', fetcher.download)))
+
+
+def disable():
+    """
+    Restores the original, uninstrumented code
+    """
+    while _patches:
+        owner, name, original = _patches.pop()
+        if isinstance(owner, dict):
+            owner[name] = original
+        else:
+            setattr(owner, name, original)
+
+    # Modules imported while enabled bound the wrappers themselves, outside of _patches
+    if _wrapped:
+        for mod in list(sys.modules.values()):
+            if not getattr(mod, '__name__', '').startswith('tinyblock'):
+                continue
+            for name, value in list(mod.__dict__.items()):
+                if isinstance(value, FunctionType) and value in _wrapped:
+                    setattr(mod, name, _wrapped[value])
+        _wrapped.clear()
+
+
+def snapshot() -> Dict[str, float]:
+    return dict(COUNTERS)
+
+
+def reset():
+    COUNTERS.clear()
+
+
+class Profile:
+    """
+    Counts accumulated between entering and leaving a `profile()` block
+    """
+
+    def __init__(self):
+        self.counts: Counter = Counter()
+        self.seconds = 0.0
+
+    def __getitem__(self, key: str) -> float:
+        return self.counts[key]
+
+    def __repr__(self):
+        return f'Profile(seconds={self.seconds:.6f}, counts={dict(self.counts)})'
+
+
+@contextmanager
+def profile() -> Iterator[Profile]:
+    """
+    Enables instrumentation for the duration of the block and collects only the counts made inside it
+    """
+    was_enabled = is_enabled()
+    enable()
+    before = Counter(COUNTERS)
+    result = Profile()
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result.seconds = time.perf_counter() - start
+        result.counts = Counter(COUNTERS)
+        result.counts.subtract(before)
+        result.counts = +result.counts
+        if not was_enabled:
+            disable()
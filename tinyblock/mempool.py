@@ -0,0 +1,316 @@
+from __future__ import annotations # For PEP 563 – Postponed Evaluation of Annotations
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+import heapq
+import itertools
+
+from .tx import Tx, TxIn
+
+
+__all__ = ['Mempool', 'MempoolEntry']
+
+# Largest in-mempool ancestor or descendant package (bitcoind's default limits)
+MAX_PACKAGE_COUNT = 25
+
+WITNESS_SCALE_FACTOR = 4
+
+
+@dataclass(eq=False)
+class MempoolEntry:
+    tx: Tx
+    txid: bytes
+    size: int
+    fee: int
+    parents: Set[bytes] = field(default_factory=set, repr=False)
+    children: Set[bytes] = field(default_factory=set, repr=False)
+
+    # Package totals include the entry itself
+    ancestor_count: int = 1
+    ancestor_size: int = 0
+    ancestor_fee: int = 0
+    descendant_count: int = 1
+    descendant_size: int = 0
+    descendant_fee: int = 0
+
+    version: int = field(default=0, repr=False)
+
+    @property
+    def weight(self) -> int:
+        return self.size * WITNESS_SCALE_FACTOR
+
+    def fee_rate(self) -> float:
+        return self.fee / self.size
+
+    def ancestor_score(self) -> float:
+        return self.ancestor_fee / self.ancestor_size
+
+    def descendant_score(self) -> float:
+        """
+        Eviction score: a transaction is worth at least what its descendants pay for it
+        """
+        return max(self.fee_rate(), self.descendant_fee / self.descendant_size)
+
+
+class Mempool:
+    """
+    Unconfirmed transactions indexed by fee rate
+
+    Each entry caches its size, fee and ancestor/descendant package totals,
+    which are adjusted incrementally along the (bounded) package on every
+    insert and removal. Eviction uses a lazily invalidated min-heap keyed
+    by descendant score, so no operation rescans the whole pool.
+    """
+
+    def __init__(self, max_size: int = 300 * 1000 * 1000, prevout_value: Callable[[TxIn], int] = None,
+            testnet: bool = False):
+        self.max_size = max_size
+        self.total_size = 0
+        self.prevout_value = prevout_value or (lambda tx_in: tx_in.value(testnet=testnet))
+
+        self._entries: Dict[bytes, MempoolEntry] = {}
+        self._spent: Dict[Tuple[bytes, int], bytes] = {}
+        self._evict_heap: List[Tuple[float, int, bytes, int]] = []
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, txid: bytes) -> bool:
+        return txid in self._entries
+
+    def get(self, txid: bytes) -> Optional[MempoolEntry]:
+        return self._entries.get(txid)
+
+    def _push_evict(self, entry: MempoolEntry):
+        entry.version += 1
+        heapq.heappush(self._evict_heap, (entry.descendant_score(), next(self._seq), entry.txid, entry.version))
+
+        if len(self._evict_heap) > 2 * len(self._entries) + 64:
+            self._evict_heap = [
+                (e.descendant_score(), next(self._seq), e.txid, e.version) for e in self._entries.values()
+            ]
+            heapq.heapify(self._evict_heap)
+
+    def _walk(self, txids: Iterable[bytes], links: str) -> Set[bytes]:
+        seen = set()
+        stack = list(txids)
+        while stack:
+            txid = stack.pop()
+            if txid in seen:
+                continue
+            seen.add(txid)
+            stack.extend(getattr(self._entries[txid], links))
+        return seen
+
+    def ancestors(self, txid: bytes) -> Set[bytes]:
+        """
+        Returns the in-mempool ancestors of a transaction, excluding itself
+        """
+        return self._walk(self._entries[txid].parents, 'parents')
+
+    def descendants(self, txid: bytes) -> Set[bytes]:
+        """
+        Returns the in-mempool descendants of a transaction, excluding itself
+        """
+        return self._walk(self._entries[txid].children, 'children')
+
+    def add(self, tx: Tx, fee: int = None) -> bool:
+        """
+        Accepts a transaction, returns False if it was evicted straight away to respect max_size
+
+        Input values come from in-mempool parents or prevout_value; they are only
+        looked up when fee is not given and only once per transaction.
+        """
+        txid = tx.hash()[::-1]
+        if txid in self._entries:
+            return True
+
+        parents = set()
+        input_value = 0
+        for tx_in in tx.tx_ins:
+            outpoint = (tx_in.prev_tx, tx_in.tx_ix)
+            if outpoint in self._spent:
+                raise ValueError(f'{txid.hex()} conflicts with {self._spent[outpoint].hex()}')
+
+            parent = self._entries.get(tx_in.prev_tx)
+            if parent is not None:
+                parents.add(parent.txid)
+                if fee is None:
+                    input_value += parent.tx.tx_outs[tx_in.tx_ix].amount
+            elif fee is None:
+                input_value += self.prevout_value(tx_in)
+
+        if fee is None:
+            fee = input_value - sum(tx_out.amount for tx_out in tx.tx_outs)
+        if fee < 0:
+            raise ValueError(f'{txid.hex()} spends more than its inputs')
+
+        ancestors = self._walk(parents, 'parents')
+        if len(ancestors) + 1 > MAX_PACKAGE_COUNT:
+            raise ValueError(f'{txid.hex()} has too many unconfirmed ancestors')
+        for a in ancestors:
+            if self._entries[a].descendant_count + 1 > MAX_PACKAGE_COUNT:
+                raise ValueError(f'{txid.hex()} exceeds the descendant limit of {a.hex()}')
+
+        size = len(tx.serialize())
+        entry = MempoolEntry(tx, txid, size, fee, parents)
+        entry.ancestor_count = len(ancestors) + 1
+        entry.ancestor_size = size
+        entry.ancestor_fee = fee
+        entry.descendant_size = size
+        entry.descendant_fee = fee
+
+        for a in ancestors:
+            ancestor = self._entries[a]
+            entry.ancestor_size += ancestor.size
+            entry.ancestor_fee += ancestor.fee
+
+            ancestor.descendant_count += 1
+            ancestor.descendant_size += size
+            ancestor.descendant_fee += fee
+            self._push_evict(ancestor)
+
+        for p in parents:
+            self._entries[p].children.add(txid)
+        for tx_in in tx.tx_ins:
+            self._spent[(tx_in.prev_tx, tx_in.tx_ix)] = txid
+
+        self._entries[txid] = entry
+        self.total_size += size
+        self._push_evict(entry)
+
+        self.trim()
+        return txid in self._entries
+
+    def _unlink(self, entry: MempoolEntry):
+        del self._entries[entry.txid]
+        self.total_size -= entry.size
+        for tx_in in entry.tx.tx_ins:
+            self._spent.pop((tx_in.prev_tx, tx_in.tx_ix), None)
+        for p in entry.parents:
+            parent = self._entries.get(p)
+            if parent is not None:
+                parent.children.discard(entry.txid)
+        for c in entry.children:
+            child = self._entries.get(c)
+            if child is not None:
+                child.parents.discard(entry.txid)
+
+    def remove(self, txid: bytes) -> List[MempoolEntry]:
+        """
+        Removes a transaction and everything spending from it, returns the removed entries
+        """
+        if txid not in self._entries:
+            return []
+
+        removed = [self._entries[t] for t in self._walk([txid], 'children')]
+        removed_ids = {e.txid for e in removed}
+
+        # Take the removed packages out of the descendant totals of the remaining ancestors
+        affected: Dict[bytes, List[MempoolEntry]] = {}
+        for e in removed:
+            for a in self._walk(e.parents, 'parents') - removed_ids:
+                affected.setdefault(a, []).append(e)
+
+        for a, gone in affected.items():
+            ancestor = self._entries[a]
+            ancestor.descendant_count -= len(gone)
+            ancestor.descendant_size -= sum(e.size for e in gone)
+            ancestor.descendant_fee -= sum(e.fee for e in gone)
+            self._push_evict(ancestor)
+
+        for e in removed:
+            self._unlink(e)
+        return removed
+
+    def remove_confirmed(self, txs: Iterable[Tx]):
+        """
+        Removes transactions included in a block, and any mempool transaction conflicting with them
+        """
+        for tx in txs:
+            txid = tx.hash()[::-1]
+            entry = self._entries.get(txid)
+            if entry is None:
+                for tx_in in tx.tx_ins:
+                    conflict = self._spent.get((tx_in.prev_tx, tx_in.tx_ix))
+                    if conflict is not None:
+                        self.remove(conflict)
+                continue
+
+            # Block order puts parents first, so any remaining ancestors are being confirmed too
+            for a in self._walk(entry.parents, 'parents'):
+                ancestor = self._entries[a]
+                ancestor.descendant_count -= 1
+                ancestor.descendant_size -= entry.size
+                ancestor.descendant_fee -= entry.fee
+                self._push_evict(ancestor)
+
+            for d in self._walk(entry.children, 'children'):
+                descendant = self._entries[d]
+                descendant.ancestor_count -= 1
+                descendant.ancestor_size -= entry.size
+                descendant.ancestor_fee -= entry.fee
+
+            self._unlink(entry)
+
+    def evict_lowest(self) -> List[MempoolEntry]:
+        """
+        Removes the package with the lowest descendant score
+        """
+        heap = self._evict_heap
+        while heap:
+            _, _, txid, version = heapq.heappop(heap)
+            entry = self._entries.get(txid)
+            if entry is not None and entry.version == version:
+                return self.remove(txid)
+        return []
+
+    def trim(self):
+        while self.total_size > self.max_size and self._entries:
+            self.evict_lowest()
+
+    def build_template(self, max_weight: int = 4000000 - 4000) -> List[Tx]:
+        """
+        Selects transactions for a block, greedily by ancestor fee rate
+
+        A package is a transaction plus its not yet selected ancestors; once
+        selected, the package totals of its descendants are reduced and they
+        are re-queued with their new score. Transactions are returned in
+        dependency order.
+        """
+        entries = self._entries
+        anc_fee = {txid: e.ancestor_fee for txid, e in entries.items()}
+        anc_size = {txid: e.ancestor_size for txid, e in entries.items()}
+
+        heap = [(-anc_fee[t] / anc_size[t], next(self._seq), t, anc_size[t]) for t in entries]
+        heapq.heapify(heap)
+
+        selected: Set[bytes] = set()
+        block: List[Tx] = []
+        weight = 0
+        while heap:
+            _, _, txid, size = heapq.heappop(heap)
+            if txid in selected or size != anc_size[txid]:
+                # Stale: a package containing part of its ancestors was selected since
+                continue
+
+            package = {txid} | (self.ancestors(txid) - selected)
+            package_weight = anc_size[txid] * WITNESS_SCALE_FACTOR
+            if weight + package_weight > max_weight:
+                continue
+
+            weight += package_weight
+            for t in sorted(package, key=lambda t: entries[t].ancestor_count):
+                selected.add(t)
+                block.append(entries[t].tx)
+
+            updated = set()
+            for t in package:
+                for d in self.descendants(t) - selected:
+                    anc_fee[d] -= entries[t].fee
+                    anc_size[d] -= entries[t].size
+                    updated.add(d)
+            for d in updated:
+                heapq.heappush(heap, (-anc_fee[d] / anc_size[d], next(self._seq), d, anc_size[d]))
+
+        return block
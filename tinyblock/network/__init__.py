@@ -0,0 +1,6 @@
+from .envelope import NetworkEnvelope, MAINNET_MAGIC, TESTNET_MAGIC, REGTEST_MAGIC
+from .messages import (
+    VersionMessage, VerAckMessage, PingMessage, PongMessage, GetHeadersMessage, HeadersMessage,
+    GetDataMessage, NotFoundMessage, TX_DATA_TYPE, BLOCK_DATA_TYPE, FILTERED_BLOCK_DATA_TYPE,
+)
+from .peer import Peer
@@ -0,0 +1,74 @@
+from __future__ import annotations # For PEP 563 – Postponed Evaluation of Annotations
+from io import BytesIO
+from typing import BinaryIO
+import asyncio
+
+from ..block import MAINNET_MAGIC, TESTNET_MAGIC, REGTEST_MAGIC
+from ..utils import hash256
+
+
+__all__ = ['NetworkEnvelope', 'MAINNET_MAGIC', 'TESTNET_MAGIC', 'REGTEST_MAGIC']
+
+# magic(4) + command(12) + payload length(4) + checksum(4)
+HEADER_SIZE = 24
+
+# Largest payload accepted from a peer (matches bitcoind's MAX_PROTOCOL_MESSAGE_LENGTH)
+MAX_PAYLOAD_SIZE = 4 * 1000 * 1000
+
+
+class NetworkEnvelope:
+    def __init__(self, command: bytes, payload: bytes, magic: bytes = MAINNET_MAGIC):
+        self.command = command
+        self.payload = payload
+        self.magic = magic
+
+    @classmethod
+    def _parse_header(cls, header: bytes, magic: bytes):
+        if header[:4] != magic:
+            raise SyntaxError(f'magic is not right {header[:4].hex()} vs {magic.hex()}')
+
+        command = header[4:16].rstrip(b'\x00')
+        length = int.from_bytes(header[16:20], 'little')
+        if length > MAX_PAYLOAD_SIZE:
+            raise SyntaxError(f'payload of {length} bytes is too large')
+        return command, length, header[20:24]
+
+    @classmethod
+    def _check(cls, command: bytes, payload: bytes, checksum: bytes, magic: bytes) -> NetworkEnvelope:
+        if hash256(payload)[:4] != checksum:
+            raise SyntaxError(f'checksum does not match for {command}')
+        return cls(command, payload, magic)
+
+    @classmethod
+    def parse(cls, s: BinaryIO, magic: bytes = MAINNET_MAGIC) -> NetworkEnvelope:
+        header = s.read(HEADER_SIZE)
+        if len(header) != HEADER_SIZE:
+            raise EOFError('connection reset')
+
+        command, length, checksum = cls._parse_header(header, magic)
+        return cls._check(command, s.read(length), checksum, magic)
+
+    @classmethod
+    async def read(cls, reader: asyncio.StreamReader, magic: bytes = MAINNET_MAGIC) -> NetworkEnvelope:
+        """
+        Reads exactly one framed message from an asyncio stream
+        """
+        header = await reader.readexactly(HEADER_SIZE)
+        command, length, checksum = cls._parse_header(header, magic)
+        payload = await reader.readexactly(length)
+        return cls._check(command, payload, checksum, magic)
+
+    def serialize(self) -> bytes:
+        ser = b''
+        ser += self.magic
+        ser += self.command + b'\x00' * (12 - len(self.command))
+        ser += len(self.payload).to_bytes(4, 'little')
+        ser += hash256(self.payload)[:4]
+        ser += self.payload
+        return ser
+
+    def stream(self) -> BytesIO:
+        return BytesIO(self.payload)
+
+    def __repr__(self):
+        return f'NetworkEnvelope({self.command.decode("ascii")}, {self.payload.hex()})'
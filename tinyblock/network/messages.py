@@ -0,0 +1,208 @@
+from __future__ import annotations # For PEP 563 – Postponed Evaluation of Annotations
+from dataclasses import dataclass, field
+from typing import BinaryIO, List, Tuple
+import time
+
+from ..block import HEADER_SIZE
+from ..utils import encode_varint, read_varint
+
+
+__all__ = [
+    'VersionMessage', 'VerAckMessage', 'PingMessage', 'PongMessage', 'GetHeadersMessage',
+    'HeadersMessage', 'GetDataMessage', 'NotFoundMessage',
+    'TX_DATA_TYPE', 'BLOCK_DATA_TYPE', 'FILTERED_BLOCK_DATA_TYPE',
+]
+
+PROTOCOL_VERSION = 70015
+
+TX_DATA_TYPE = 1
+BLOCK_DATA_TYPE = 2
+FILTERED_BLOCK_DATA_TYPE = 3
+
+
+def _ipv4_mapped(ip: bytes) -> bytes:
+    return b'\x00' * 10 + b'\xff\xff' + ip
+
+
+@dataclass
+class VersionMessage:
+    command = b'version'
+
+    version: int = PROTOCOL_VERSION
+    services: int = 0
+    timestamp: int = field(default_factory=lambda: int(time.time()))
+    receiver_services: int = 0
+    receiver_ip: bytes = b'\x00\x00\x00\x00'
+    receiver_port: int = 8333
+    sender_services: int = 0
+    sender_ip: bytes = b'\x00\x00\x00\x00'
+    sender_port: int = 8333
+    nonce: bytes = b'\x00' * 8
+    user_agent: bytes = b'/tinyblock:0.1/'
+    latest_block: int = 0
+    relay: bool = False
+
+    def serialize(self) -> bytes:
+        ser = b''
+        ser += self.version.to_bytes(4, 'little')
+        ser += self.services.to_bytes(8, 'little')
+        ser += self.timestamp.to_bytes(8, 'little')
+        ser += self.receiver_services.to_bytes(8, 'little')
+        ser += _ipv4_mapped(self.receiver_ip)
+        ser += self.receiver_port.to_bytes(2, 'big')
+        ser += self.sender_services.to_bytes(8, 'little')
+        ser += _ipv4_mapped(self.sender_ip)
+        ser += self.sender_port.to_bytes(2, 'big')
+        ser += self.nonce
+        ser += encode_varint(len(self.user_agent))
+        ser += self.user_agent
+        ser += self.latest_block.to_bytes(4, 'little')
+        ser += b'\x01' if self.relay else b'\x00'
+        return ser
+
+    @classmethod
+    def parse(cls, s: BinaryIO) -> VersionMessage:
+        version = int.from_bytes(s.read(4), 'little')
+        services = int.from_bytes(s.read(8), 'little')
+        timestamp = int.from_bytes(s.read(8), 'little')
+        receiver_services = int.from_bytes(s.read(8), 'little')
+        receiver_ip = s.read(16)[12:]
+        receiver_port = int.from_bytes(s.read(2), 'big')
+        sender_services = int.from_bytes(s.read(8), 'little')
+        sender_ip = s.read(16)[12:]
+        sender_port = int.from_bytes(s.read(2), 'big')
+        nonce = s.read(8)
+        user_agent = s.read(read_varint(s))
+        latest_block = int.from_bytes(s.read(4), 'little')
+        relay = s.read(1) == b'\x01'
+
+        return cls(version, services, timestamp, receiver_services, receiver_ip, receiver_port,
+                   sender_services, sender_ip, sender_port, nonce, user_agent, latest_block, relay)
+
+
+class VerAckMessage:
+    command = b'verack'
+
+    def serialize(self) -> bytes:
+        return b''
+
+    @classmethod
+    def parse(cls, s: BinaryIO) -> VerAckMessage:
+        return cls()
+
+
+@dataclass
+class PingMessage:
+    command = b'ping'
+
+    nonce: bytes
+
+    def serialize(self) -> bytes:
+        return self.nonce
+
+    @classmethod
+    def parse(cls, s: BinaryIO) -> PingMessage:
+        return cls(s.read(8))
+
+
+@dataclass
+class PongMessage:
+    command = b'pong'
+
+    nonce: bytes
+
+    def serialize(self) -> bytes:
+        return self.nonce
+
+    @classmethod
+    def parse(cls, s: BinaryIO) -> PongMessage:
+        return cls(s.read(8))
+
+
+@dataclass
+class GetHeadersMessage:
+    command = b'getheaders'
+
+    locator: List[bytes]
+    stop: bytes = b'\x00' * 32
+    version: int = PROTOCOL_VERSION
+
+    def serialize(self) -> bytes:
+        """
+        Serializes a getheaders request, locator and stop hashes are big endian
+        """
+        ser = b''
+        ser += self.version.to_bytes(4, 'little')
+        ser += encode_varint(len(self.locator))
+        for block_hash in self.locator:
+            ser += block_hash[::-1]
+        ser += self.stop[::-1]
+        return ser
+
+    @classmethod
+    def parse(cls, s: BinaryIO) -> GetHeadersMessage:
+        version = int.from_bytes(s.read(4), 'little')
+        locator = [s.read(32)[::-1] for _ in range(read_varint(s))]
+        stop = s.read(32)[::-1]
+        return cls(locator, stop, version)
+
+
+@dataclass
+class HeadersMessage:
+    command = b'headers'
+
+    raw: bytes = b''
+
+    def __len__(self) -> int:
+        return len(self.raw) // HEADER_SIZE
+
+    def serialize(self) -> bytes:
+        ser = encode_varint(len(self))
+        for offset in range(0, len(self.raw), HEADER_SIZE):
+            ser += self.raw[offset:offset + HEADER_SIZE] + b'\x00'
+        return ser
+
+    @classmethod
+    def parse(cls, s: BinaryIO) -> HeadersMessage:
+        """
+        Collects the headers into one contiguous buffer ready for HeaderChain.add_headers
+        """
+        count = read_varint(s)
+        raw = bytearray()
+        for _ in range(count):
+            raw += s.read(HEADER_SIZE)
+            if read_varint(s) != 0:
+                raise SyntaxError('number of txs not 0')
+        return cls(bytes(raw))
+
+
+@dataclass
+class GetDataMessage:
+    command = b'getdata'
+
+    items: List[Tuple[int, bytes]] = field(default_factory=list)
+
+    def add(self, data_type: int, identifier: bytes):
+        """
+        Adds an inventory item, identifier is the big endian tx or block hash
+        """
+        self.items.append((data_type, identifier))
+
+    def serialize(self) -> bytes:
+        ser = encode_varint(len(self.items))
+        for data_type, identifier in self.items:
+            ser += data_type.to_bytes(4, 'little')
+            ser += identifier[::-1]
+        return ser
+
+    @classmethod
+    def parse(cls, s: BinaryIO) -> GetDataMessage:
+        items = []
+        for _ in range(read_varint(s)):
+            data_type = int.from_bytes(s.read(4), 'little')
+            items.append((data_type, s.read(32)[::-1]))
+        return cls(items)
+
+
+class NotFoundMessage(GetDataMessage):
+    command = b'notfound'
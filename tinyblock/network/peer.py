@@ -0,0 +1,311 @@
+from __future__ import annotations # For PEP 563 – Postponed Evaluation of Annotations
+from collections import Counter, defaultdict, deque
+from typing import AsyncIterator, Deque, Dict, Iterable, List, Optional, Tuple
+import asyncio
+import os
+import time
+
+from ..block import HEADER_SIZE
+from ..tx import Tx
+from ..utils import hash256
+from .envelope import NetworkEnvelope, MAINNET_MAGIC
+from .messages import (
+    VersionMessage, VerAckMessage, PingMessage, PongMessage, GetHeadersMessage, HeadersMessage,
+    GetDataMessage, NotFoundMessage, TX_DATA_TYPE,
+)
+
+
+__all__ = ['Peer']
+
+# Most headers a peer returns for one getheaders request
+MAX_HEADERS_RESULTS = 2000
+
+# Commands a peer may answer a getdata with
+DATA_COMMANDS = (b'tx', b'block', b'merkleblock', NotFoundMessage.command)
+
+# Most unclaimed messages kept per command, older ones are dropped (unsolicited inv, addr, ...)
+MAX_QUEUED = 1000
+
+
+def _inventory_hashes(envelope: NetworkEnvelope) -> List[bytes]:
+    """
+    Returns the (big endian) identifiers of the inventory items a getdata response answers
+    """
+    if envelope.command == NotFoundMessage.command:
+        return [identifier for _, identifier in NotFoundMessage.parse(envelope.stream()).items]
+    if envelope.command == b'tx':
+        return [hash256(envelope.payload)[::-1]]
+    return [hash256(envelope.payload[:HEADER_SIZE])[::-1]]
+
+
+class Peer:
+    """
+    An asyncio connection to a single bitcoin node
+
+    A background task reads framed messages as they arrive and routes them:
+    pongs to their ping, getdata replies to the request for their inventory
+    hash and everything else to a queue per command. Concurrent requests on
+    one peer therefore never consume each other's replies, and requests can
+    be written ahead of their responses (see `window`) instead of one round
+    trip at a time. Every request takes an optional timeout in seconds.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+            magic: bytes = MAINNET_MAGIC, window: int = 16):
+        self.reader = reader
+        self.writer = writer
+        self.magic = magic
+        self.window = window
+        self.version: Optional[VersionMessage] = None
+
+        # Unclaimed messages and the receive() calls waiting for them, per command
+        self._queues: Dict[bytes, Deque[NetworkEnvelope]] = defaultdict(lambda: deque(maxlen=MAX_QUEUED))
+        self._waiters: Dict[bytes, Deque[asyncio.Future]] = defaultdict(deque)
+        # get_data requests waiting for a reply, per (big endian) inventory hash
+        self._data_waiters: Dict[bytes, Deque[asyncio.Future]] = defaultdict(deque)
+        self._error: Optional[Exception] = None
+        self._pings: Dict[bytes, asyncio.Future] = {}
+        # Replies still owed to abandoned requests, per command, dropped on arrival
+        self._stale: Counter = Counter()
+        self._reader_task = asyncio.ensure_future(self._read_loop())
+
+    @classmethod
+    async def connect(cls, host: str, port: int = 8333, magic: bytes = MAINNET_MAGIC, window: int = 16,
+            handshake: bool = True) -> Peer:
+        reader, writer = await asyncio.open_connection(host, port)
+        peer = cls(reader, writer, magic, window)
+        if handshake:
+            await peer.handshake()
+        return peer
+
+    async def _read_loop(self):
+        try:
+            while True:
+                envelope = await NetworkEnvelope.read(self.reader, self.magic)
+                if envelope.command == PingMessage.command:
+                    await self.send(PongMessage(envelope.payload))
+                elif envelope.command == PongMessage.command:
+                    waiter = self._pings.pop(envelope.payload, None)
+                    if waiter is not None and not waiter.done():
+                        waiter.set_result(time.monotonic())
+                elif envelope.command in DATA_COMMANDS:
+                    self._deliver_data(envelope)
+                else:
+                    self._deliver(envelope)
+        except (asyncio.IncompleteReadError, ConnectionError, SyntaxError) as e:
+            self._error = e
+        finally:
+            if self._error is None:
+                self._error = ConnectionError('peer closed')
+            waiters = [*self._pings.values()]
+            waiters += [waiter for queue in self._waiters.values() for waiter in queue]
+            waiters += [waiter for queue in self._data_waiters.values() for waiter in queue]
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(ConnectionError('peer disconnected'))
+
+    def _deliver(self, envelope: NetworkEnvelope):
+        """
+        Hands a message to the oldest receive() waiting for its command, or queues it
+        """
+        if self._stale[envelope.command]:
+            self._stale[envelope.command] -= 1
+            return
+        waiters = self._waiters.get(envelope.command)
+        while waiters:
+            waiter = waiters.popleft()
+            # Done waiters timed out, were cancelled or got a message of another of their commands
+            if not waiter.done():
+                waiter.set_result(envelope)
+                return
+        self._queues[envelope.command].append(envelope)
+
+    def _deliver_data(self, envelope: NetworkEnvelope):
+        """
+        Resolves the oldest get_data request for each inventory item the message answers, dropping unrequested ones
+        """
+        if not self._data_waiters:
+            return
+        for identifier in _inventory_hashes(envelope):
+            waiters = self._data_waiters.get(identifier)
+            while waiters:
+                waiter = waiters.popleft()
+                if not waiter.done():
+                    waiter.set_result(envelope)
+                    break
+            if waiters is not None and not waiters:
+                del self._data_waiters[identifier]
+
+    def _abandon(self, command: bytes, count: int = 1):
+        """
+        Discards the replies still owed to count abandoned requests, whether already queued or not
+        """
+        queue = self._queues.get(command)
+        while count and queue:
+            queue.popleft()
+            count -= 1
+        self._stale[command] += count
+
+    async def send(self, message):
+        """
+        Frames and writes a message (anything with a command and serialize())
+        """
+        envelope = NetworkEnvelope(message.command, message.serialize(), self.magic)
+        self.writer.write(envelope.serialize())
+        await self.writer.drain()
+
+    async def receive(self, *commands: bytes, timeout: float = None) -> NetworkEnvelope:
+        """
+        Returns the next message with one of the given commands
+
+        Messages of other commands stay queued for their own receivers. Raises
+        asyncio.TimeoutError if none arrives within timeout seconds.
+        """
+        for command in commands:
+            queue = self._queues.get(command)
+            if queue:
+                return queue.popleft()
+        if self._error is not None:
+            raise ConnectionError('peer disconnected') from self._error
+
+        waiter = asyncio.get_running_loop().create_future()
+        for command in commands:
+            self._waiters[command].append(waiter)
+        try:
+            return await asyncio.wait_for(waiter, timeout)
+        finally:
+            for command in commands:
+                waiters = self._waiters.get(command)
+                if waiters and waiter in waiters:
+                    waiters.remove(waiter)
+
+    async def handshake(self, version: VersionMessage = None):
+        await self.send(version or VersionMessage(nonce=os.urandom(8)))
+
+        envelope = await self.receive(VersionMessage.command)
+        self.version = VersionMessage.parse(envelope.stream())
+        await self.send(VerAckMessage())
+        await self.receive(VerAckMessage.command)
+
+    async def ping(self) -> float:
+        """
+        Returns the round trip time of a ping in seconds
+        """
+        nonce = os.urandom(8)
+        waiter = asyncio.get_running_loop().create_future()
+        self._pings[nonce] = waiter
+
+        start = time.monotonic()
+        await self.send(PingMessage(nonce))
+        return await waiter - start
+
+    async def get_headers(self, locator: List[bytes], stop: bytes = b'\x00' * 32, timeout: float = None) -> bytes:
+        """
+        Returns the concatenated raw headers following the locator
+        """
+        await self.send(GetHeadersMessage(locator, stop))
+        try:
+            envelope = await self.receive(HeadersMessage.command, timeout=timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            self._abandon(HeadersMessage.command)
+            raise
+        return HeadersMessage.parse(envelope.stream()).raw
+
+    async def sync_headers(self, chain, timeout: float = None) -> int:
+        """
+        Downloads headers into a HeaderChain until the peer has no more, returns the number added
+
+        The next getheaders is sent as soon as a batch arrives, before the batch
+        is validated, so validation overlaps the next round trip. timeout
+        bounds each round trip. If the sync fails with a request in flight,
+        its reply is discarded on arrival.
+        """
+        added = 0
+        outstanding = 0
+        try:
+            await self.send(GetHeadersMessage(chain.locator()))
+            outstanding += 1
+            while True:
+                envelope = await self.receive(HeadersMessage.command, timeout=timeout)
+                outstanding -= 1
+                raw = HeadersMessage.parse(envelope.stream()).raw
+                full = len(raw) == MAX_HEADERS_RESULTS * HEADER_SIZE
+                if full:
+                    await self.send(GetHeadersMessage([hash256(raw[-HEADER_SIZE:])[::-1]]))
+                    outstanding += 1
+
+                added += chain.add_headers(raw)
+                if not full:
+                    return added
+        finally:
+            self._abandon(HeadersMessage.command, outstanding)
+
+    async def get_data(self, items: Iterable[Tuple[int, bytes]],
+            timeout: float = None) -> AsyncIterator[NetworkEnvelope]:
+        """
+        Yields the response to each inventory item in request order
+
+        Up to `window` getdata requests are kept in flight; a notfound reply
+        yields its envelope in place of the missing object. Responses are
+        matched to requests by inventory hash, so replies to an abandoned
+        get_data are dropped on arrival. Raises asyncio.TimeoutError if a
+        response takes longer than timeout seconds.
+        """
+        requested: Deque[Tuple[bytes, asyncio.Future]] = deque()
+        loop = asyncio.get_running_loop()
+
+        async def next_response() -> NetworkEnvelope:
+            envelope = await asyncio.wait_for(requested[0][1], timeout)
+            requested.popleft()
+            return envelope
+
+        try:
+            for data_type, identifier in items:
+                if self._error is not None:
+                    raise ConnectionError('peer disconnected') from self._error
+                # Registered before sending, the reply may arrive while the request is written
+                waiter = loop.create_future()
+                self._data_waiters[identifier].append(waiter)
+                requested.append((identifier, waiter))
+                await self.send(GetDataMessage([(data_type, identifier)]))
+                if len(requested) < self.window:
+                    continue
+
+                yield await next_response()
+
+            while requested:
+                yield await next_response()
+        finally:
+            for identifier, waiter in requested:
+                waiter.cancel()
+                waiters = self._data_waiters.get(identifier)
+                if waiters is not None:
+                    if waiter in waiters:
+                        waiters.remove(waiter)
+                    if not waiters:
+                        del self._data_waiters[identifier]
+
+    async def get_transactions(self, tx_ids: Iterable[bytes],
+            timeout: float = None) -> AsyncIterator[Optional[Tx]]:
+        """
+        Yields each requested transaction (big endian ids) in order, or None if the peer does not have it
+        """
+        async for envelope in self.get_data(((TX_DATA_TYPE, tx_id) for tx_id in tx_ids), timeout):
+            if envelope.command == NotFoundMessage.command:
+                yield None
+            else:
+                yield Tx.parse(envelope.stream())
+
+    async def close(self):
+        self._reader_task.cancel()
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+    async def __aenter__(self) -> Peer:
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
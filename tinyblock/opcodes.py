@@ -1,5 +1,4 @@
 from typing import Callable, List
-from unittest import result
 
 from tinyblock.typing import OpcodeMap, OpcodeValue
 from tinyblock.utils import hash160, hash256
@@ -0,0 +1,287 @@
+from __future__ import annotations # For PEP 563 – Postponed Evaluation of Annotations
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Union
+import mmap
+import multiprocessing
+
+from .block import MAINNET_MAGIC
+from .utils import decode_checksum_base58, hash160, hash256, read_varint_at
+
+
+__all__ = [
+    'WalletScanner', 'Received', 'Spent', 'watch_keys', 'script_key', 'read_block_file', 'scan_files',
+    'KIND_PKH', 'KIND_SH',
+]
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+# Watch keys are a kind byte followed by the 20 byte hash the output script commits to
+KIND_PKH = b'\x00'
+KIND_SH = b'\x05'
+
+ADDRESS_KINDS = {
+    0x00: KIND_PKH,  # mainnet p2pkh
+    0x6f: KIND_PKH,  # testnet p2pkh
+    0x05: KIND_SH,   # mainnet p2sh
+    0xc4: KIND_SH,   # testnet p2sh
+}
+
+P2PKH_PREFIX = b'\x76\xa9\x14'  # OP_DUP OP_HASH160 <20 bytes>
+P2PKH_SUFFIX = b'\x88\xac'      # OP_EQUALVERIFY OP_CHECKSIG
+P2SH_PREFIX = b'\xa9\x14'       # OP_HASH160 <20 bytes>
+P2SH_SUFFIX = b'\x87'           # OP_EQUAL
+
+
+def watch_keys(addresses: Iterable[str]) -> Set[bytes]:
+    """
+    Decodes base58 p2pkh and p2sh addresses into the watch keys matched by script_key
+    """
+    keys = set()
+    for address in addresses:
+        raw = decode_checksum_base58(address)
+        kind = ADDRESS_KINDS.get(raw[0]) if len(raw) == 21 else None
+        if kind is None:
+            raise ValueError(f'{address} is not a p2pkh or p2sh address')
+        keys.add(kind + raw[1:])
+    return keys
+
+
+def script_key(script: bytes) -> Optional[bytes]:
+    """
+    Returns the watch key of a raw output script (without its length prefix), None for other script types
+
+    p2pk outputs are keyed by the hash160 of their public key, so they match
+    the p2pkh address of the same key.
+    """
+    length = len(script)
+    if length == 25 and script[:3] == P2PKH_PREFIX and script[23:] == P2PKH_SUFFIX:
+        return KIND_PKH + script[3:23]
+    if length == 23 and script[:2] == P2SH_PREFIX and script[22:] == P2SH_SUFFIX:
+        return KIND_SH + script[2:22]
+    if (length == 35 or length == 67) and script[0] == length - 2 and script[-1] == 0xac:
+        return KIND_PKH + hash160(script[1:-1])
+    return None
+
+
+@dataclass(frozen=True)
+class Received:
+    """
+    A watched output: tx_hash is big endian (as TxIn.prev_tx), key is its watch key
+    """
+    tx_hash: bytes
+    index: int
+    amount: int
+    key: bytes
+
+    @property
+    def outpoint(self) -> bytes:
+        return self.tx_hash[::-1] + self.index.to_bytes(4, 'little')
+
+
+@dataclass(frozen=True)
+class Spent:
+    """
+    Input input_index of tx_hash spends the previously received prev_tx_hash:prev_index
+    """
+    tx_hash: bytes
+    input_index: int
+    prev_tx_hash: bytes
+    prev_index: int
+
+
+Event = Union[Received, Spent]
+
+
+class WalletScanner:
+    """
+    Streams raw transactions and blocks, reporting outputs paying watch keys and spends of them
+
+    Transactions are walked byte by byte: output scripts are compared as raw
+    bytes and outpoints looked up as 36 byte strings, so no Tx or Script
+    objects are built and a transaction is only hashed when it matches.
+    """
+
+    def __init__(self, keys: Iterable[bytes], unspent: Iterable[Received] = (), track_spends: bool = True):
+        self.keys = keys if isinstance(keys, (set, frozenset)) else set(keys)
+        self.track_spends = track_spends
+        # Serialized outpoint (little endian hash + index) to the output received there
+        self.unspent: Dict[bytes, Received] = {}
+        self.add_unspent(unspent)
+
+    def add_unspent(self, received: Iterable[Received]):
+        for r in received:
+            self.unspent[r.outpoint] = r
+
+    def scan_tx(self, raw: Buffer) -> List[Event]:
+        return self._scan(raw, 0, 1)
+
+    def scan_block(self, raw: Buffer) -> List[Event]:
+        """
+        Scans every transaction of a serialized block (80 byte header, varint count, transactions)
+        """
+        count, pos = read_varint_at(raw, 80)
+        return self._scan(raw, pos, count)
+
+    def _scan(self, buf: Buffer, pos: int, count: int) -> List[Event]:
+        """
+        Scans count transactions from pos to the end of buf, leaving the unspent set untouched on errors
+        """
+        events = []
+        journal = []
+        try:
+            for _ in range(count):
+                pos = self._scan_at(buf, pos, events, journal)
+            if pos != len(buf):
+                raise ValueError(f'{len(buf) - pos} trailing bytes after the last transaction')
+        except Exception:
+            for outpoint, received in reversed(journal):
+                if received is None:
+                    del self.unspent[outpoint]
+                else:
+                    self.unspent[outpoint] = received
+            raise
+        return events
+
+    def scan_block_file(self, path: str, magic: bytes = MAINNET_MAGIC) -> Iterator[Event]:
+        for block in read_block_file(path, magic):
+            yield from self.scan_block(block)
+
+    def _scan_at(self, buf: Buffer, pos: int, events: List[Event], journal: List) -> int:
+        """
+        Scans the transaction at pos and returns its end
+
+        The unspent set is only updated once the whole transaction has been read;
+        each change is recorded in journal as (outpoint, previous value or None).
+        """
+        start = pos
+        pos += 4
+        if pos >= len(buf):
+            raise ValueError('transaction is truncated')
+        segwit = buf[pos] == 0
+        if segwit:
+            pos += 2
+        body_start = pos
+        num_inputs, pos = read_varint_at(buf, pos)
+
+        # Input index and outpoint of every spend, applied once the tx is known to be complete
+        spends = []
+        unspent = self.unspent
+        track_spends = self.track_spends and bool(unspent)
+        for i in range(num_inputs):
+            if track_spends:
+                outpoint = bytes(buf[pos:pos + 36])
+                if outpoint in unspent:
+                    spends.append((i, outpoint))
+            length, pos = read_varint_at(buf, pos + 36)
+            pos += length + 4
+
+        # Output index, amount and watch key of every match
+        matches = []
+        keys = self.keys
+        num_outputs, pos = read_varint_at(buf, pos)
+        for k in range(num_outputs):
+            length, script_start = read_varint_at(buf, pos + 8)
+            key = script_key(bytes(buf[script_start:script_start + length]))
+            if key is not None and key in keys:
+                matches.append((k, int.from_bytes(buf[pos:pos + 8], 'little'), key))
+            pos = script_start + length
+        body_end = pos
+
+        if segwit:
+            for _ in range(num_inputs):
+                items, pos = read_varint_at(buf, pos)
+                for _ in range(items):
+                    length, pos = read_varint_at(buf, pos)
+                    pos += length
+        end = pos + 4
+        if end > len(buf):
+            raise ValueError('transaction is truncated')
+
+        if spends or matches:
+            if segwit:
+                # The txid commits to the legacy serialization, without marker, flag and witnesses
+                h = hash256(bytes(buf[start:start + 4]) + bytes(buf[body_start:body_end]) + bytes(buf[pos:end]))
+            else:
+                h = hash256(buf[start:end])
+            tx_hash = h[::-1]
+
+            for i, outpoint in spends:
+                # An earlier input of this tx may have spent the same outpoint already
+                prev = unspent.pop(outpoint, None)
+                if prev is not None:
+                    journal.append((outpoint, prev))
+                    events.append(Spent(tx_hash, i, prev.tx_hash, prev.index))
+            for k, amount, key in matches:
+                received = Received(tx_hash, k, amount, key)
+                events.append(received)
+                if self.track_spends:
+                    journal.append((received.outpoint, unspent.get(received.outpoint)))
+                    unspent[received.outpoint] = received
+
+        return end
+
+
+def read_block_file(path: str, magic: bytes = MAINNET_MAGIC) -> Iterator[bytes]:
+    """
+    Yields the raw blocks of a bitcoind blk*.dat file (magic, 4 byte length, block, repeated)
+    """
+    with open(path, 'rb') as f:
+        if f.seek(0, 2) == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            pos = 0
+            while pos + 8 <= len(mm):
+                record_magic = mm[pos:pos + 4]
+                if record_magic != magic:
+                    # bitcoind preallocates block files, the zero padding ends the data
+                    if record_magic == b'\x00\x00\x00\x00':
+                        return
+                    raise ValueError(f'bad magic at offset {pos} of {path}')
+                size = int.from_bytes(mm[pos + 4:pos + 8], 'little')
+                yield mm[pos + 8:pos + 8 + size]
+                pos += 8 + size
+
+
+# Worker state for scan_files, set once per process by the pool initializer
+_worker_keys: Set[bytes] = set()
+_worker_unspent: List[Received] = []
+_worker_magic: bytes = MAINNET_MAGIC
+
+
+def _init_worker(keys: Set[bytes], unspent: List[Received], magic: bytes):
+    global _worker_keys, _worker_unspent, _worker_magic
+    _worker_keys, _worker_unspent, _worker_magic = keys, unspent, magic
+
+
+def _receive_shard(path: str) -> List[Event]:
+    return list(WalletScanner(_worker_keys, track_spends=False).scan_block_file(path, _worker_magic))
+
+
+def _spend_shard(path: str) -> List[Event]:
+    scanner = WalletScanner((), _worker_unspent)
+    return list(scanner.scan_block_file(path, _worker_magic))
+
+
+def scan_files(paths: List[str], keys: Iterable[bytes], processes: int = None,
+               magic: bytes = MAINNET_MAGIC) -> List[Event]:
+    """
+    Scans block files for received outputs and their spends, sharding the files over processes
+
+    A spend may sit in a different file than the output it spends, so with
+    more than one process the files are scanned twice in parallel: once for
+    received outputs and once, with all of them known, for spends. With a
+    single process the files are scanned once, in order.
+    """
+    keys = set(keys)
+    processes = processes or multiprocessing.cpu_count()
+    if processes == 1 or len(paths) <= 1:
+        scanner = WalletScanner(keys)
+        return [event for path in paths for event in scanner.scan_block_file(path, magic)]
+
+    with multiprocessing.Pool(processes, _init_worker, (keys, [], magic)) as pool:
+        received = [event for shard in pool.imap(_receive_shard, paths) for event in shard]
+
+    with multiprocessing.Pool(processes, _init_worker, (set(), received, magic)) as pool:
+        spent = [event for shard in pool.imap(_spend_shard, paths) for event in shard]
+
+    return received + spent
@@ -1,6 +1,6 @@
 from __future__ import annotations # For PEP 563 – Postponed Evaluation of Annotations
 from typing import BinaryIO, List, Union
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from tinyblock.utils import read_varint, hash256, encode_varint, hash160
 from tinyblock.opcodes import OP_CODE_FUNCTIONS, OP_CODE_NAMES
@@ -11,7 +11,7 @@ __all__ = ['Script']
 
 @dataclass
 class Script:
-    cmds: List[Union[int, bytes]]
+    cmds: List[Union[int, bytes]] = field(default_factory=list)
 
     @classmethod
     def parse(cls, s: BinaryIO) -> Script:
@@ -20,7 +20,7 @@ class Script:
         cmds = []
         count = 0
         while count < len_script:
-            current = s.read()
+            current = s.read(1)
             count += 1
             curr_byte = current[0]
             if curr_byte >= 1 and curr_byte <= 75:
@@ -50,16 +50,17 @@ class Script:
                 ser += int.to_bytes(cmd, 1, 'little')
             else:
                 length = len(cmd)
-                if length < 75:
+                if length <= 75:
                     ser += int.to_bytes(length, 1, 'little')
-                elif length > 75 and length < 256:
+                elif length < 256:
                     ser += int.to_bytes(76, 1, 'little')
                     ser += int.to_bytes(length, 1, 'little')
-                elif length > 256 and length < 520:
-                    ser += int.to_bytes(77, 1)
+                elif length <= 520:
+                    ser += int.to_bytes(77, 1, 'little')
                     ser += int.to_bytes(length, 2, 'little')
                 else:
                     raise ValueError('too long')
+                ser += cmd
 
         return encode_varint(len(ser)) + ser                
 
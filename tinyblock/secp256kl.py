@@ -1,12 +1,17 @@
-from typing import Union
-from random import randint
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 from dataclasses import dataclass, field
+from io import BytesIO
+import hashlib
+import hmac
+import mmap
+import os
 
 from .ecc import FieldElement, Point, Curve
 from .utils import hash160, checksum_base58
 
 
-__all__ = ['Signature', 'S256Point', 'S256Field', 'G', 'PrivateKey']
+__all__ = ['Signature', 'S256Point', 'S256Field', 'G', 'PrivateKey', 'generator_multiply', 'generator_multiply_many',
+           'batch_inverse', 'save_generator_table', 'load_generator_table', 'verify_generator_table']
 
 # Order of the curve 
 P = 2**256 - 2**32 - 977
@@ -37,7 +42,7 @@ class Signature:
             sb = b'\x00' + sb
 
         res += bytes([2, len(sb)]) + sb
-        return bytes([30, len(res)]) + res
+        return bytes([0x30, len(res)]) + res
 
 
     @classmethod
@@ -109,7 +114,7 @@ class S256Point(Point):
             if self.y.num % 2 == 0:
                 return b'\x02' + self.x.num.to_bytes(32, 'big')
             else:
-                return b'\x02' + self.x.num.to_bytes(32, 'big')
+                return b'\x03' + self.x.num.to_bytes(32, 'big')
         else:
             return b'\x04' + self.x.num.to_bytes(32, 'big') + self.y.num.to_bytes(32, 'big')
 
@@ -120,8 +125,8 @@ class S256Point(Point):
             y = int.from_bytes(sec_byte[33:65], 'big')
             return S256Point(x, y)
 
-        x = int.from_bytes(sec_byte[1:], 'big')
-        y2 = cls.curve(x)
+        x = S256Field(int.from_bytes(sec_byte[1:], 'big'))
+        y2 = x**3 + S256Field(B)
         y = y2.sqrt()
 
         if y.num % 2 == 0:
@@ -142,6 +147,8 @@ class S256Point(Point):
 
     def __rmul__(self, coef: int):
         coef = coef % N
+        if self is G:
+            return generator_multiply(coef)
         return super().__rmul__(coef)
 
     def __repr__(self):
@@ -153,21 +160,352 @@ G = S256Point(
     0x483ada7726a3c4655da4fbfc0e1108a8fd17b448a68554199c47d08ffb10d4b8
 )
 
+def batch_inverse(values: List[int], modulus: int) -> List[int]:
+    """
+    Returns the modular inverses of values using a single modular inversion (Montgomery's trick)
+    """
+    prefix = []
+    acc = 1
+    for v in values:
+        prefix.append(acc)
+        acc = acc * v % modulus
+
+    inv = pow(acc, modulus - 2, modulus)
+    result = [0] * len(values)
+    for i in range(len(values) - 1, -1, -1):
+        result[i] = inv * prefix[i] % modulus
+        inv = inv * values[i] % modulus
+    return result
+
+
+JacobianPoint = Tuple[int, int, int]
+
+
+def _jacobian_double(X: int, Y: int, Z: int) -> JacobianPoint:
+    if Y == 0 or Z == 0:
+        return 0, 1, 0
+    YY = Y * Y % P
+    S = 4 * X * YY % P
+    M = 3 * X * X % P
+    X3 = (M * M - 2 * S) % P
+    Y3 = (M * (S - X3) - 8 * YY * YY) % P
+    return X3, Y3, 2 * Y * Z % P
+
+
+def _jacobian_add_affine(X1: int, Y1: int, Z1: int, x2: int, y2: int) -> JacobianPoint:
+    if Z1 == 0:
+        return x2, y2, 1
+    Z1Z1 = Z1 * Z1 % P
+    H = (x2 * Z1Z1 - X1) % P
+    R = (y2 * Z1 * Z1Z1 - Y1) % P
+    if H == 0:
+        if R == 0:
+            return _jacobian_double(X1, Y1, Z1)
+        return 0, 1, 0
+    HH = H * H % P
+    HHH = H * HH % P
+    V = X1 * HH % P
+    X3 = (R * R - HHH - 2 * V) % P
+    Y3 = (R * (V - X3) - Y1 * HHH) % P
+    return X3, Y3, Z1 * H % P
+
+
+# Fixed-base multiplication of G uses a table of d * 16**i * G for every 4-bit window
+WINDOW_BITS = 4
+TABLE_ROWS = 256 // WINDOW_BITS
+TABLE_COLUMNS = 2**WINDOW_BITS - 1
+
+# The table is persisted as MAGIC, version (2 bytes), window bits (1 byte),
+# a reserved byte and the sha256 of the payload, followed by the payload:
+# x and y (32 bytes big endian each) of every entry, row by row
+TABLE_MAGIC = b'TBGT'
+TABLE_VERSION = 1
+TABLE_HEADER_SIZE = 40
+TABLE_ENTRY_SIZE = 64
+
+
+def _default_table_path() -> str:
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'tinyblock', f'secp256k1-g{WINDOW_BITS}-v{TABLE_VERSION}.bin')
+
+
+# Where the table is loaded from and saved to, an empty TINYBLOCK_TABLE_CACHE disables persistence
+TABLE_CACHE_PATH: Optional[str] = os.environ.get('TINYBLOCK_TABLE_CACHE', None)
+if TABLE_CACHE_PATH is None:
+    TABLE_CACHE_PATH = _default_table_path()
+
+_generator_table_ints: List[List[Tuple[int, int]]] = []
+
+
+def _compute_generator_table() -> List[List[Tuple[int, int]]]:
+    """
+    Builds the table row by row in Jacobian coordinates, with one shared inversion per row
+
+    Each row holds d * base for d = 1..15 plus 16 * base, the next row's base,
+    all normalized to affine coordinates together with batch_inverse.
+    """
+    table = []
+    bx, by = G.x.num, G.y.num
+    for _ in range(TABLE_ROWS):
+        points = [(bx, by, 1)]
+        for _ in range(TABLE_COLUMNS):
+            points.append(_jacobian_add_affine(*points[-1], bx, by))
+
+        z_invs = batch_inverse([Z for _, _, Z in points], P)
+        row = []
+        for (X, Y, _), z_inv in zip(points, z_invs):
+            z_inv2 = z_inv * z_inv % P
+            row.append((X * z_inv2 % P, Y * z_inv2 * z_inv % P))
+        bx, by = row.pop()
+        table.append(row)
+    return table
+
+
+def save_generator_table(path: str, table: List[List[Tuple[int, int]]] = None):
+    """
+    Writes the fixed-base table of G to path, atomically replacing any previous file
+    """
+    table = table or generator_table_ints()
+    payload = b''.join(x.to_bytes(32, 'big') + y.to_bytes(32, 'big') for row in table for x, y in row)
+    header = TABLE_MAGIC + TABLE_VERSION.to_bytes(2, 'big') + bytes([WINDOW_BITS, 0]) + hashlib.sha256(payload).digest()
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(header + payload)
+    os.replace(tmp, path)
+
+
+def load_generator_table(path: str) -> Optional[List[List[Tuple[int, int]]]]:
+    """
+    Memory maps a table written by save_generator_table, None if it is missing, stale or corrupt
+    """
+    size = TABLE_HEADER_SIZE + TABLE_ROWS * TABLE_COLUMNS * TABLE_ENTRY_SIZE
+    try:
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if len(mm) != size or mm[:4] != TABLE_MAGIC or mm[4:8] != TABLE_VERSION.to_bytes(2, 'big') + bytes([WINDOW_BITS, 0]):
+                return None
+            if hashlib.sha256(mm[TABLE_HEADER_SIZE:]).digest() != mm[8:TABLE_HEADER_SIZE]:
+                return None
+
+            table = []
+            pos = TABLE_HEADER_SIZE
+            for _ in range(TABLE_ROWS):
+                row = []
+                for _ in range(TABLE_COLUMNS):
+                    row.append((int.from_bytes(mm[pos:pos + 32], 'big'), int.from_bytes(mm[pos + 32:pos + 64], 'big')))
+                    pos += TABLE_ENTRY_SIZE
+                table.append(row)
+    except (OSError, ValueError):
+        return None
+
+    if not verify_generator_table(table):
+        return None
+    return table
+
+
+def _jacobian_matches(point: JacobianPoint, x: int, y: int) -> bool:
+    X, Y, Z = point
+    if Z == 0:
+        return False
+    ZZ = Z * Z % P
+    return X == x * ZZ % P and Y == y * ZZ * Z % P
+
+
+def verify_generator_table(table: List[List[Tuple[int, int]]]) -> bool:
+    """
+    Checks that a (loaded) table really holds d * 16**i * G
+
+    The checksum in the file only catches accidental damage, so every entry is
+    checked to be on the curve and to be the sum of its neighbours: each row
+    entry is the previous entry plus the row's base and each row's base is
+    the previous row's last entry plus its base, starting from G. Those sums
+    use the Jacobian formulas the table is computed with, so the last row is
+    also rebuilt with the generic affine Point arithmetic as a cross-check.
+    """
+    if len(table) != TABLE_ROWS or any(len(row) != TABLE_COLUMNS for row in table):
+        return False
+    if table[0][0] != (G.x.num, G.y.num):
+        return False
+
+    for row in table:
+        for x, y in row:
+            if not (0 <= x < P and 0 <= y < P) or (y * y - x * x * x - B) % P:
+                return False
+
+    for i, row in enumerate(table):
+        bx, by = row[0]
+        for d in range(1, TABLE_COLUMNS):
+            if not _jacobian_matches(_jacobian_add_affine(*row[d - 1], 1, bx, by), *row[d]):
+                return False
+        if i + 1 < len(table) and not _jacobian_matches(_jacobian_add_affine(*row[-1], 1, bx, by), *table[i + 1][0]):
+            return False
+
+    base = S256Point(*table[-1][0])
+    point = base
+    for x, y in table[-1][1:]:
+        point = point + base
+        if (point.x.num, point.y.num) != (x, y):
+            return False
+    return True
+
+
+def generator_table_ints() -> List[List[Tuple[int, int]]]:
+    """
+    Returns the fixed-base table of G as (x, y) integers
+
+    The table is built on first use, loaded from TABLE_CACHE_PATH when a valid
+    copy exists there, and saved there otherwise.
+    """
+    if not _generator_table_ints:
+        table = load_generator_table(TABLE_CACHE_PATH) if TABLE_CACHE_PATH else None
+        if table is None:
+            table = _compute_generator_table()
+            if TABLE_CACHE_PATH:
+                try:
+                    save_generator_table(TABLE_CACHE_PATH, table)
+                except OSError:
+                    pass
+        _generator_table_ints.extend(table)
+    return _generator_table_ints
+
+
+def generator_multiply_jacobian(coef: int) -> JacobianPoint:
+    """
+    Returns coef * G in Jacobian coordinates (X/Z**2, Y/Z**3), without any modular inversion
+    """
+    coef = coef % N
+    X, Y, Z = 0, 1, 0
+    for row in generator_table_ints():
+        if not coef:
+            break
+        digit = coef & (2**WINDOW_BITS - 1)
+        if digit:
+            X, Y, Z = _jacobian_add_affine(X, Y, Z, *row[digit - 1])
+        coef >>= WINDOW_BITS
+    return X, Y, Z
+
+
+def generator_multiply(coef: int) -> S256Point:
+    """
+    Returns coef * G with one table addition per non-zero 4-bit window of coef and a single inversion
+    """
+    X, Y, Z = generator_multiply_jacobian(coef)
+    if Z == 0:
+        return S256Point(None, None)
+    z_inv = batch_inverse([Z], P)[0]
+    z_inv2 = z_inv * z_inv % P
+    return S256Point(X * z_inv2 % P, Y * z_inv2 * z_inv % P)
+
+
+def generator_multiply_many(coefs: Iterable[int], offset: S256Point = None) -> List[S256Point]:
+    """
+    Returns coef * G (+ offset) for every coef, normalizing all the points with one shared inversion
+    """
+    points = []
+    for coef in coefs:
+        X, Y, Z = generator_multiply_jacobian(coef)
+        if offset is not None and offset.x is not None:
+            X, Y, Z = _jacobian_add_affine(X, Y, Z, offset.x.num, offset.y.num)
+        points.append((X, Y, Z))
+
+    # The point at infinity (Z = 0) has no inverse, 1 keeps it out of the shared product
+    z_invs = batch_inverse([Z or 1 for _, _, Z in points], P)
+    result = []
+    for (X, Y, Z), z_inv in zip(points, z_invs):
+        if Z == 0:
+            result.append(S256Point(None, None))
+            continue
+        z_inv2 = z_inv * z_inv % P
+        result.append(S256Point(X * z_inv2 % P, Y * z_inv2 * z_inv % P))
+    return result
+
+
+# Number of (digest -> signature) pairs remembered per key
+SIGNATURE_CACHE_SIZE = 1024
+
 
 @dataclass
 class PrivateKey:
     secret: int
     point: S256Point = field(init=False, repr=False)
+    _signatures: Dict[int, Signature] = field(default_factory=dict, init=False, repr=False, compare=False)
 
     def __post_init__(self):
         self.point = self.secret * G
 
-    def sign(self, z: int):
-        k = randint(0, N) # TODO: use deterministic k
-        r = (k * G).x.num
-        k_inv = pow(k, N-2, N)
+    @classmethod
+    def _from_point(cls, secret: int, point: S256Point) -> 'PrivateKey':
+        """
+        Builds a key whose point the caller already computed as secret*G (e.g. with generator_multiply_many)
+        """
+        key = cls.__new__(cls)
+        key.secret = secret
+        key.point = point
+        key._signatures = {}
+        return key
+
+    def deterministic_k(self, z: int) -> int:
+        """
+        Returns the RFC6979 nonce for the digest z (HMAC-DRBG over SHA256)
+        """
+        k = b'\x00' * 32
+        v = b'\x01' * 32
+        if z > N:
+            z -= N
+        z_bytes = z.to_bytes(32, 'big')
+        secret_bytes = self.secret.to_bytes(32, 'big')
+        s256 = hashlib.sha256
+        k = hmac.new(k, v + b'\x00' + secret_bytes + z_bytes, s256).digest()
+        v = hmac.new(k, v, s256).digest()
+        k = hmac.new(k, v + b'\x01' + secret_bytes + z_bytes, s256).digest()
+        v = hmac.new(k, v, s256).digest()
+        while True:
+            v = hmac.new(k, v, s256).digest()
+            candidate = int.from_bytes(v, 'big')
+            if candidate >= 1 and candidate < N:
+                return candidate
+            k = hmac.new(k, v + b'\x00', s256).digest()
+            v = hmac.new(k, v, s256).digest()
+
+    def clear_signature_cache(self):
+        self._signatures.clear()
+
+    def _remember(self, z: int, sig: Signature):
+        if len(self._signatures) >= SIGNATURE_CACHE_SIZE:
+            del self._signatures[next(iter(self._signatures))]
+        self._signatures[z] = sig
+
+    def _finish(self, z: int, r: int, k_inv: int) -> Signature:
         s = (z + r * self.secret) * k_inv % N
-        if s > N/2:
+        if s > N // 2:
             s = N - s
-
         return Signature(r, s)
+
+    def sign(self, z: int) -> Signature:
+        return self.sign_many([z])[0]
+
+    def sign_many(self, zs: Iterable[int]) -> List[Signature]:
+        """
+        Signs every digest in zs, sharing the modular inversions across the batch
+
+        Nonce points are computed in Jacobian coordinates and normalized with one
+        inversion mod P, and all k**-1 come from one inversion mod N.
+        Previously signed digests are served from the signature cache.
+        """
+        zs = list(zs)
+        signed = {z: self._signatures[z] for z in zs if z in self._signatures}
+        todo = [z for z in dict.fromkeys(zs) if z not in signed]
+
+        if todo:
+            ks = [self.deterministic_k(z) for z in todo]
+            points = [generator_multiply_jacobian(k) for k in ks]
+            z_invs = batch_inverse([Z for _, _, Z in points], P)
+            k_invs = batch_inverse(ks, N)
+
+            for z, (X, _, _), z_inv, k_inv in zip(todo, points, z_invs, k_invs):
+                r = X * z_inv * z_inv % P % N
+                signed[z] = self._finish(z, r, k_inv)
+                self._remember(z, signed[z])
+
+        return [signed[z] for z in zs]
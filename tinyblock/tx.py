@@ -4,8 +4,6 @@ from typing import List, Union, BinaryIO
 from io import BytesIO
 import os
 
-import requests
-
 from .utils import hash256, encode_varint, read_varint
 from .script import Script
 
@@ -83,33 +81,52 @@ class TxOut:
 
 
 class TxFetcher:
-    @staticmethod
-    def fetch(tx_id: str, testnet=False):
-        CACHE_DIR = 'tx_cache'
+    CACHE_DIR = 'tx_cache'
+
+    @classmethod
+    def fetch(cls, tx_id: str, testnet=False):
         assert isinstance(tx_id, str)
-        tx_cache_file = os.path.join(CACHE_DIR, tx_id)
-        if os.path.exists(tx_cache_file):
-            with open(tx_cache_file, 'rb') as f:
-                raw = f.read()
+        raw = cls.read_cache(tx_id)
+        if raw is None:
+            raw = cls.download(tx_id, testnet=testnet)
+            cls.write_cache(tx_id, raw)
 
-        else:
-            if testnet:
-                base = 'https://blockstream.info/testnet/api/tx/'
-            else:
-                base =  'https://blockstream.info/api/tx/'
-            res = requests.get(f'{base}/{tx_id}/hex')
-            assert res.status_code == 200
-            raw = bytes.fromhex(res.text.strip())
+        tx = Tx.parse(BytesIO(raw))
+
+        return tx
+
+    @classmethod
+    def read_cache(cls, tx_id: str) -> Union[bytes, None]:
+        """
+        Returns the cached raw transaction or None if it has not been fetched before
+        """
+        tx_cache_file = os.path.join(cls.CACHE_DIR, tx_id)
+        if not os.path.exists(tx_cache_file):
+            return None
 
-            if not os.path.isdir(CACHE_DIR):
-                os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(tx_cache_file, 'rb') as f:
+            return f.read()
 
-            with open(tx_cache_file, 'wb') as f:
-                f.write(raw)
+    @classmethod
+    def write_cache(cls, tx_id: str, raw: bytes):
+        if not os.path.isdir(cls.CACHE_DIR):
+            os.makedirs(cls.CACHE_DIR, exist_ok=True)
 
-        tx = Tx.parse(BytesIO(raw))
+        with open(os.path.join(cls.CACHE_DIR, tx_id), 'wb') as f:
+            f.write(raw)
 
-        return tx
+    @staticmethod
+    def download(tx_id: str, testnet=False) -> bytes:
+        # Imported on first download, most users of this module never fetch
+        import requests
+
+        if testnet:
+            base = 'https://blockstream.info/testnet/api/tx/'
+        else:
+            base =  'https://blockstream.info/api/tx/'
+        res = requests.get(f'{base}/{tx_id}/hex')
+        assert res.status_code == 200
+        return bytes.fromhex(res.text.strip())
 
 @dataclass(repr=False)
 class Tx:
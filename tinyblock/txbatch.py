@@ -0,0 +1,345 @@
+from __future__ import annotations # For PEP 563 – Postponed Evaluation of Annotations
+from array import array
+from bisect import bisect_right
+from io import BytesIO
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+from .script import Script
+from .tx import Tx, TxIn, TxOut
+from .utils import encode_varint, hash256, read_varint_at
+
+
+__all__ = ['TxBatch']
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+COINBASE_PREV_TX = b'\x00' * 32
+COINBASE_PREV_IX = 0xffffffff
+
+# Every column and arena, in the order they are declared in TxBatch.__init__
+COLUMNS = (
+    'versions', 'locktimes', 'tx_hashes', 'in_start', 'out_start',
+    'prev_txs', 'prev_ixs', 'sequences', 'script_sigs', 'script_sig_start', 'witnesses', 'witness_start',
+    'amounts', 'script_pubkeys', 'script_pubkey_start',
+)
+
+
+def _check(buf: Buffer, pos: int, size: int):
+    if pos + size > len(buf):
+        raise ValueError('transaction is truncated')
+
+
+class TxBatch:
+    """
+    Columnar (structure of arrays) store of many transactions
+
+    Every field lives in a typed array column or a contiguous byte arena, so a
+    transaction costs its serialized size plus a few integers instead of a
+    tree of Tx, TxIn, TxOut and Script objects. Inputs and outputs of
+    transaction i are the rows in_start[i]:in_start[i + 1] and
+    out_start[i]:out_start[i + 1] of the input and output columns, and script
+    j occupies script_*_start[j]:script_*_start[j + 1] of its arena.
+
+    Hashes (tx_hashes and prev_txs) are kept in serialization (little endian)
+    order, 32 bytes per row; tx_hashes are txids, which exclude witnesses.
+    Segwit witnesses are kept per input row in their own arena. The array columns support the buffer protocol,
+    so numpy.frombuffer views them without copying.
+    """
+
+    def __init__(self, testnet: bool = False):
+        self.testnet = testnet
+
+        # Per transaction
+        self.versions = array('I')
+        self.locktimes = array('I')
+        self.tx_hashes = bytearray()
+        self.in_start = array('Q', [0])
+        self.out_start = array('Q', [0])
+
+        # Per input
+        self.prev_txs = bytearray()
+        self.prev_ixs = array('I')
+        self.sequences = array('I')
+        self.script_sigs = bytearray()
+        self.script_sig_start = array('Q', [0])
+        self.witnesses = bytearray()
+        self.witness_start = array('Q', [0])
+
+        # Per output
+        self.amounts = array('Q')
+        self.script_pubkeys = bytearray()
+        self.script_pubkey_start = array('Q', [0])
+
+    @classmethod
+    def from_raw(cls, raws: Iterable[Buffer], testnet: bool = False) -> TxBatch:
+        batch = cls(testnet)
+        for raw in raws:
+            batch.add_raw(raw)
+        return batch
+
+    @classmethod
+    def from_block(cls, raw: Buffer, testnet: bool = False) -> TxBatch:
+        batch = cls(testnet)
+        batch.add_block(raw)
+        return batch
+
+    def add_raw(self, raw: Buffer):
+        """
+        Appends one serialized transaction, leaving the batch unchanged if it is malformed
+        """
+        mark = self._mark()
+        try:
+            end = self._parse_at(raw, 0)
+            if end != len(raw):
+                raise ValueError(f'{len(raw) - end} trailing bytes after the transaction')
+        except Exception:
+            self._rollback(mark)
+            raise
+
+    def add_block(self, raw: Buffer):
+        """
+        Appends every transaction of a serialized block (80 byte header, varint count, transactions)
+
+        Either the whole block is added or, if any of it is malformed, none of it.
+        """
+        mark = self._mark()
+        try:
+            count, pos = read_varint_at(raw, 80)
+            for _ in range(count):
+                pos = self._parse_at(raw, pos)
+            if pos != len(raw):
+                raise ValueError(f'{len(raw) - pos} trailing bytes after the last transaction')
+        except Exception:
+            self._rollback(mark)
+            raise
+
+    def _mark(self) -> Dict[str, int]:
+        return {name: len(getattr(self, name)) for name in COLUMNS}
+
+    def _rollback(self, mark: Dict[str, int]):
+        for name, length in mark.items():
+            del getattr(self, name)[length:]
+
+    def _parse_at(self, buf: Buffer, pos: int) -> int:
+        """
+        Parses the transaction starting at pos straight into the columns and returns its end
+
+        Rows are appended as they are read, callers roll the columns back on errors.
+        """
+        start = pos
+        _check(buf, pos, 5)
+        version = int.from_bytes(buf[pos:pos + 4], 'little')
+        pos += 4
+        segwit = buf[pos] == 0
+        if segwit:
+            _check(buf, pos, 2)
+            if buf[pos + 1] != 1:
+                raise ValueError(f'unknown segwit flag {buf[pos + 1]}')
+            pos += 2
+        body_start = pos
+        num_inputs, pos = read_varint_at(buf, pos)
+
+        prev_txs = self.prev_txs
+        script_sigs = self.script_sigs
+        for _ in range(num_inputs):
+            _check(buf, pos, 36)
+            prev_txs += buf[pos:pos + 32]
+            self.prev_ixs.append(int.from_bytes(buf[pos + 32:pos + 36], 'little'))
+            length, pos = read_varint_at(buf, pos + 36)
+            _check(buf, pos, length + 4)
+            script_sigs += buf[pos:pos + length]
+            self.script_sig_start.append(len(script_sigs))
+            pos += length
+            self.sequences.append(int.from_bytes(buf[pos:pos + 4], 'little'))
+            pos += 4
+
+        num_outputs, pos = read_varint_at(buf, pos)
+        script_pubkeys = self.script_pubkeys
+        for _ in range(num_outputs):
+            _check(buf, pos, 8)
+            self.amounts.append(int.from_bytes(buf[pos:pos + 8], 'little'))
+            length, pos = read_varint_at(buf, pos + 8)
+            _check(buf, pos, length)
+            script_pubkeys += buf[pos:pos + length]
+            self.script_pubkey_start.append(len(script_pubkeys))
+            pos += length
+        body_end = pos
+
+        # Every input gets a (possibly empty) witness row, kept as its raw serialization
+        witnesses = self.witnesses
+        for _ in range(num_inputs):
+            if segwit:
+                witness_start = pos
+                items, pos = read_varint_at(buf, pos)
+                for _ in range(items):
+                    length, pos = read_varint_at(buf, pos)
+                    _check(buf, pos, length)
+                    pos += length
+                witnesses += buf[witness_start:pos]
+            self.witness_start.append(len(witnesses))
+
+        _check(buf, pos, 4)
+        self.locktimes.append(int.from_bytes(buf[pos:pos + 4], 'little'))
+        pos += 4
+
+        self.versions.append(version)
+        if segwit:
+            # The txid commits to the legacy serialization, without marker, flag and witnesses
+            legacy = bytes(buf[start:start + 4]) + bytes(buf[body_start:body_end]) + bytes(buf[pos - 4:pos])
+            self.tx_hashes += hash256(legacy)
+        else:
+            self.tx_hashes += hash256(buf[start:pos])
+        self.in_start.append(len(self.prev_ixs))
+        self.out_start.append(len(self.amounts))
+        return pos
+
+    def __len__(self) -> int:
+        return len(self.versions)
+
+    def __getitem__(self, i: int) -> Tx:
+        return self.tx(i)
+
+    def __iter__(self) -> Iterator[Tx]:
+        for i in range(len(self)):
+            yield self.tx(i)
+
+    @property
+    def input_counts(self) -> array:
+        start = self.in_start
+        return array('I', (start[i + 1] - start[i] for i in range(len(self))))
+
+    @property
+    def output_counts(self) -> array:
+        start = self.out_start
+        return array('I', (start[i + 1] - start[i] for i in range(len(self))))
+
+    def tx_hash(self, i: int) -> bytes:
+        return bytes(self.tx_hashes[32 * i:32 * i + 32])
+
+    def prev_tx(self, j: int) -> bytes:
+        """
+        Returns the (big endian) previous transaction hash of input row j, as stored in TxIn.prev_tx
+        """
+        return bytes(self.prev_txs[32 * j:32 * j + 32][::-1])
+
+    def script_sig(self, j: int) -> bytes:
+        return bytes(self.script_sigs[self.script_sig_start[j]:self.script_sig_start[j + 1]])
+
+    def witness(self, j: int) -> bytes:
+        """
+        Returns the serialized witness of input row j (item count and items), empty for legacy transactions
+        """
+        return bytes(self.witnesses[self.witness_start[j]:self.witness_start[j + 1]])
+
+    def script_pubkey(self, k: int) -> bytes:
+        return bytes(self.script_pubkeys[self.script_pubkey_start[k]:self.script_pubkey_start[k + 1]])
+
+    def is_coinbase(self, i: int) -> bool:
+        j = self.in_start[i]
+        return (
+            self.in_start[i + 1] - j == 1 and self.prev_ixs[j] == COINBASE_PREV_IX
+            and self.prev_txs[32 * j:32 * j + 32] == COINBASE_PREV_TX
+        )
+
+    def tx(self, i: int) -> Tx:
+        """
+        Materializes transaction i as a Tx
+
+        Tx has no witness support, so witnesses are not carried over and a segwit
+        transaction comes back in its legacy (txid) serialization.
+        """
+        if i < 0:
+            i += len(self)
+        tx_ins = []
+        for j in range(self.in_start[i], self.in_start[i + 1]):
+            script_sig = _parse_script(self.script_sig(j))
+            tx_ins.append(TxIn(self.prev_tx(j), self.prev_ixs[j], script_sig, self.sequences[j]))
+
+        tx_outs = []
+        for k in range(self.out_start[i], self.out_start[i + 1]):
+            tx_outs.append(TxOut(self.amounts[k], _parse_script(self.script_pubkey(k))))
+
+        return Tx(self.versions[i], tx_ins, tx_outs, self.locktimes[i], self.testnet)
+
+    def total_output_value(self) -> int:
+        return sum(self.amounts)
+
+    def output_values(self) -> array:
+        """
+        Returns the summed output value of every transaction
+        """
+        amounts = self.amounts
+        start = self.out_start
+        return array('Q', (sum(amounts[start[i]:start[i + 1]]) for i in range(len(self))))
+
+    def value_histogram(self, edges: Sequence[int] = None) -> List[int]:
+        """
+        Counts output amounts per bucket
+
+        With edges, bucket b holds amounts in [edges[b - 1], edges[b]) (bucket 0 is
+        below edges[0], the last one at or above edges[-1]). Without, bucket b
+        holds amounts of bit length b, i.e. powers of two: 0, 1, 2-3, 4-7, ...
+        """
+        if edges is None:
+            counts = [0] * 65
+            for amount in self.amounts:
+                counts[amount.bit_length()] += 1
+            return counts
+
+        counts = [0] * (len(edges) + 1)
+        for amount in self.amounts:
+            counts[bisect_right(edges, amount)] += 1
+        return counts
+
+    def input_values(self, prevout_value: Callable[[bytes, int], Optional[int]] = None) -> array:
+        """
+        Resolves the value spent by every input row
+
+        Outputs created inside the batch are resolved from the amounts column,
+        anything else through prevout_value(prev_tx, tx_ix) with prev_tx in
+        big endian order as in TxIn. Coinbase inputs are worth 0.
+        """
+        created: Dict[bytes, int] = {self.tx_hash(i): i for i in range(len(self))}
+
+        values = array('Q', bytes(8 * len(self.prev_ixs)))
+        for j in range(len(self.prev_ixs)):
+            prev, ix = bytes(self.prev_txs[32 * j:32 * j + 32]), self.prev_ixs[j]
+            i = created.get(prev)
+            if i is not None and ix < self.out_start[i + 1] - self.out_start[i]:
+                values[j] = self.amounts[self.out_start[i] + ix]
+                continue
+            if ix == COINBASE_PREV_IX and prev == COINBASE_PREV_TX:
+                continue
+
+            value = prevout_value(prev[::-1], ix) if prevout_value is not None else None
+            if value is None:
+                raise ValueError(f'cannot resolve the value of {prev[::-1].hex()}:{ix}')
+            values[j] = value
+        return values
+
+    def fees(self, input_values: array = None) -> array:
+        """
+        Returns the fee of every transaction given the input_values() of the batch, 0 for coinbases
+        """
+        if input_values is None:
+            input_values = self.input_values()
+
+        outputs = self.output_values()
+        start = self.in_start
+        fees = array('q')
+        for i in range(len(self)):
+            if self.is_coinbase(i):
+                fees.append(0)
+            else:
+                fees.append(sum(input_values[start[i]:start[i + 1]]) - outputs[i])
+        return fees
+
+    def __repr__(self):
+        return (
+            f'{self.__class__.__name__}(txs={len(self)}, inputs={len(self.prev_ixs)}, '
+            f'outputs={len(self.amounts)})'
+        )
+
+
+def _parse_script(raw: bytes) -> Script:
+    return Script.parse(BytesIO(encode_varint(len(raw)) + raw))
@@ -1,8 +1,9 @@
-from typing import BinaryIO
+from typing import BinaryIO, Tuple, Union
 import hashlib
 
 
 BASE58_CHARSET: str = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+BASE58_INDEX = {c: i for i, c in enumerate(BASE58_CHARSET)}
 
 
 def base58_encode(s: bytearray) -> str:
@@ -25,6 +26,20 @@ def base58_encode(s: bytearray) -> str:
         res = BASE58_CHARSET[mod] + res
     return prefix + res
 
+def base58_decode(s: str) -> bytes:
+    """
+    Decodes a base58 string into bytes
+    """
+    num = 0
+    for char in s:
+        try:
+            num = num * 58 + BASE58_INDEX[char]
+        except KeyError:
+            raise ValueError(f'{char!r} is not a base58 character') from None
+
+    count = len(s) - len(s.lstrip('1'))
+    return b'\x00' * count + num.to_bytes((num.bit_length() + 7) // 8, 'big')
+
 def hash160(s: bytearray):
     """
     Returns the ripemd160 digest of the sha256 digest
@@ -44,6 +59,17 @@ def checksum_base58(s):
     return base58_encode(s + hash256(s)[:4])
 
 
+def decode_checksum_base58(s: str) -> bytes:
+    """
+    Decodes a base58 string and returns its payload after verifying the trailing checksum
+    """
+    raw = base58_decode(s)
+    payload, checksum = raw[:-4], raw[-4:]
+    if hash256(payload)[:4] != checksum:
+        raise ValueError(f'bad checksum for {s}')
+    return payload
+
+
 def read_varint(stream: BinaryIO) -> bytes:
     """
     Reads a variable size integer from a stream
@@ -59,6 +85,20 @@ def read_varint(stream: BinaryIO) -> bytes:
     else:
         return i
 
+def read_varint_at(buf: Union[bytes, bytearray, memoryview], pos: int) -> Tuple[int, int]:
+    """
+    Reads a variable size integer at pos of a buffer and returns it with the position following it
+    """
+    if pos >= len(buf):
+        raise ValueError(f'varint at {pos} is truncated')
+    i = buf[pos]
+    if i < 0xfd:
+        return i, pos + 1
+    size = 2 if i == 0xfd else 4 if i == 0xfe else 8
+    if pos + 1 + size > len(buf):
+        raise ValueError(f'varint at {pos} is truncated')
+    return int.from_bytes(buf[pos + 1:pos + 1 + size], 'little'), pos + 1 + size
+
 def encode_varint(i: int) -> bytes:
     """
     Encodes an integer as a varint